@@ -0,0 +1,339 @@
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from conexion_db import (
+    PERFIL_SQLITE,
+    RUTA_DB,
+    conectar_db,
+    generacion_crawl,
+    preparar_db,
+)
+from visualizar_libros import (
+    TAMANO_PAGINA,
+    CacheConsultas,
+    ConsultaLibros,
+    entero_positivo,
+    orden_valido,
+    precio_valido,
+    rating_valido,
+    texto_busqueda,
+)
+
+# --- Configuración del servicio ---
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PUERTO = int(os.getenv("API_PUERTO", "8080"))
+API_CONEXIONES = int(os.getenv("API_CONEXIONES", "8"))  # conexiones de lectura
+API_LIMITE_MAX = int(os.getenv("API_LIMITE_MAX", "100"))  # libros por respuesta
+
+# Una conexión de solo lectura no puede cambiar journal_mode ni synchronous
+PERFIL_LECTURA = {
+    pragma: valor
+    for pragma, valor in PERFIL_SQLITE.items()
+    if pragma not in {"journal_mode", "synchronous"}
+}
+
+CAMPOS_LIBRO = ["titulo", "precio", "stock", "rating", "url", "genero", "autores"]
+
+ESTADOS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+def conectar_lectura(ruta=RUTA_DB):
+    uri = f"file:{Path(ruta).resolve().as_posix()}?mode=ro"
+    return conectar_db(uri, PERFIL_LECTURA, uri=True, check_same_thread=False)
+
+
+# --- Pool de conexiones ---
+class PoolLectura:
+    """Conexiones mode=ro usadas desde hilos, fuera del event loop.
+
+    Cada conexión tiene su propia CacheConsultas; el executor tiene tantos
+    hilos como conexiones, así que nunca se espera por una libre.
+    """
+
+    def __init__(self, ruta=RUTA_DB, tamano=API_CONEXIONES):
+        self.caches = queue.SimpleQueue()
+        for _ in range(tamano):
+            self.caches.put(CacheConsultas(conectar_lectura(ruta)))
+        self.executor = ThreadPoolExecutor(tamano, thread_name_prefix="api-db")
+        self.version = VersionDatos(ruta)
+
+    def _ejecutar(self, funcion, *args):
+        cache = self.caches.get()
+        try:
+            return funcion(cache, *args)
+        finally:
+            self.caches.put(cache)
+
+    async def ejecutar(self, funcion, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self._ejecutar, funcion, *args
+        )
+
+    def cerrar(self):
+        self.executor.shutdown()
+        while not self.caches.empty():
+            self.caches.get().conn.close()
+        self.version.conn.close()
+
+
+class VersionDatos:
+    """Versión de la base para los ETag.
+
+    PRAGMA data_version solo se puede comparar dentro de una misma conexión,
+    por eso se consulta siempre desde esta, y el arranque distingue los
+    contadores de distintas ejecuciones del servicio.
+    """
+
+    def __init__(self, ruta=RUTA_DB):
+        self.conn = conectar_lectura(ruta)
+        self.lock = threading.Lock()
+        self.arranque = f"{time.time_ns():x}"
+        self.ultima = None
+        self.cambios = 0
+        self.generacion = 0
+
+    def actual(self):
+        with self.lock:
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self.ultima:
+                self.ultima = version
+                self.cambios += 1
+                self.generacion = generacion_crawl(self.conn)
+            return f"{self.arranque}-{self.generacion}-{self.cambios}"
+
+
+# --- Parámetros de la consulta ---
+def un_valor(parametros, nombre):
+    valores = parametros.get(nombre)
+    return valores[-1] if valores else None
+
+
+def codificar_clave(clave):
+    texto = json.dumps(list(clave), separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_clave(texto):
+    relleno = "=" * (-len(texto) % 4)
+    try:
+        clave = json.loads(base64.urlsafe_b64decode(texto + relleno))
+    except (ValueError, TypeError):
+        raise ValueError("Parámetro 'despues' inválido")
+    # json.loads acepta NaN e Infinity: tampoco sirven como clave
+    if not isinstance(clave, list) or not all(
+        isinstance(valor, (int, str))
+        or (isinstance(valor, float) and math.isfinite(valor))
+        for valor in clave
+    ):
+        raise ValueError("Parámetro 'despues' inválido")
+    return tuple(clave)
+
+
+def construir_consulta(parametros):
+    # Los mismos filtros que construir_query, tomados de la query string
+    convertir = {
+        "rating": rating_valido,
+        "rating_min": rating_valido,
+        "precio_min": precio_valido,
+        "precio_max": precio_valido,
+        "genero": str,
+        "autor": str,
+        "texto": texto_busqueda,
+    }
+    filtros = {}
+    for nombre, conversion in convertir.items():
+        valor = un_valor(parametros, nombre)
+        if valor:
+            try:
+                filtros[nombre] = conversion(valor.strip())
+            except ValueError:
+                raise ValueError(f"Valor inválido para '{nombre}': {valor}")
+    disponible = un_valor(parametros, "disponible")
+    filtros["disponible"] = (disponible or "").lower() in {"1", "true", "s", "si"}
+    consulta = ConsultaLibros(**filtros)
+
+    orden = un_valor(parametros, "orden")
+    if orden:
+        try:
+            campo, descendente = orden_valido(orden)
+        except ValueError:
+            raise ValueError(f"Valor inválido para 'orden': {orden}")
+        consulta.ordenar(campo, descendente)
+    columnas = consulta.columnas_orden()  # valida relevancia sin texto
+
+    limite_texto = un_valor(parametros, "limite")
+    try:
+        limite = entero_positivo(limite_texto) if limite_texto else TAMANO_PAGINA
+    except ValueError:
+        raise ValueError(f"Valor inválido para 'limite': {limite_texto}")
+    despues = un_valor(parametros, "despues")
+    despues = decodificar_clave(despues) if despues else None
+    if despues is not None and len(despues) != len(columnas):
+        raise ValueError("Parámetro 'despues' no corresponde al orden pedido")
+    return consulta, min(limite, API_LIMITE_MAX), despues
+
+
+# --- Respuestas (se ejecutan en los hilos del pool) ---
+def listar_libros(cache, consulta, limite, despues):
+    # Una fila extra indica si hay página siguiente
+    libros = cache.consultar(*consulta.sql(despues, limite + 1))
+    siguiente = None
+    if len(libros) > limite:
+        libros = libros[:limite]
+        siguiente = codificar_clave(libros[-1][len(CAMPOS_LIBRO) :])
+    return {
+        "libros": [dict(zip(CAMPOS_LIBRO, libro)) for libro in libros],
+        "siguiente": siguiente,
+    }
+
+
+def listar_generos(cache):
+    filas = cache.consultar("SELECT nombre FROM generos ORDER BY nombre")
+    return {"generos": [fila[0] for fila in filas]}
+
+
+def con_etag(cache, version, objetivo, etag_cliente, funcion, *args):
+    # La versión se lee antes de consultar: si cambia en el medio, el ETag
+    # queda viejo y el cliente vuelve a pedir, nunca al revés.
+    etag = hashlib.blake2b(
+        f"{version.actual()}|{objetivo}".encode(), digest_size=12
+    ).hexdigest()
+    etag = f'"{etag}"'
+    if etag_cliente == etag:
+        return 304, etag, None
+    return 200, etag, funcion(cache, *args)
+
+
+RUTAS = {"/libros": listar_libros, "/generos": listar_generos}
+
+
+async def responder(pool, metodo, objetivo, cabeceras):
+    partes = urlsplit(objetivo)
+    funcion = RUTAS.get(partes.path.rstrip("/") or "/")
+    if funcion is None:
+        return 404, {}, {"error": f"Ruta desconocida: {partes.path}"}
+    if metodo != "GET":
+        return 405, {"Allow": "GET"}, {"error": "Solo se admite GET"}
+
+    args = ()
+    if funcion is listar_libros:
+        try:
+            args = construir_consulta(parse_qs(partes.query))
+        except ValueError as e:
+            return 400, {}, {"error": str(e)}
+
+    estado, etag, datos = await pool.ejecutar(
+        con_etag,
+        pool.version,
+        objetivo,
+        cabeceras.get("if-none-match"),
+        funcion,
+        *args,
+    )
+    return estado, {"ETag": etag, "Cache-Control": "no-cache"}, datos
+
+
+# --- Servidor HTTP/1.1 mínimo con keep-alive ---
+async def leer_peticion(reader):
+    linea = await reader.readline()
+    if not linea:
+        return None
+    metodo, objetivo, version = linea.decode("latin-1").split()
+    cabeceras = {}
+    while True:
+        linea = await reader.readline()
+        if linea in {b"\r\n", b"\n", b""}:
+            break
+        nombre, _, valor = linea.decode("latin-1").partition(":")
+        cabeceras[nombre.strip().lower()] = valor.strip()
+    largo = int(cabeceras.get("content-length", "0"))
+    if largo:
+        await reader.readexactly(largo)  # GET no usa cuerpo; se descarta
+    return metodo, objetivo, version, cabeceras
+
+
+def armar_respuesta(estado, cabeceras, datos, mantener):
+    cuerpo = b""
+    if datos is not None:
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        cabeceras["Content-Type"] = "application/json; charset=utf-8"
+    cabeceras["Content-Length"] = str(len(cuerpo))
+    cabeceras["Connection"] = "keep-alive" if mantener else "close"
+    lineas = [f"HTTP/1.1 {estado} {ESTADOS[estado]}"]
+    lineas += [f"{nombre}: {valor}" for nombre, valor in cabeceras.items()]
+    return ("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1") + cuerpo
+
+
+async def atender(pool, reader, writer):
+    try:
+        while True:
+            peticion = await leer_peticion(reader)
+            if peticion is None:
+                break
+            metodo, objetivo, version, cabeceras = peticion
+            mantener = (
+                version == "HTTP/1.1"
+                and cabeceras.get("connection", "").lower() != "close"
+            )
+            try:
+                estado, extra, datos = await responder(
+                    pool, metodo, objetivo, cabeceras
+                )
+            except Exception:
+                # El cliente recibe un 500 en vez de una conexión cortada
+                traceback.print_exc()
+                estado, extra, datos = 500, {}, {"error": "Error interno"}
+            writer.write(armar_respuesta(estado, extra, datos, mantener))
+            await writer.drain()
+            if not mantener:
+                break
+    except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+        pass  # cliente desconectado o petición mal formada
+    finally:
+        writer.close()
+
+
+async def servir(host=API_HOST, puerto=API_PUERTO, ruta=RUTA_DB):
+    # El pool es de solo lectura: las migraciones pendientes van antes
+    conn = conectar_db(ruta)
+    preparar_db(conn)
+    conn.close()
+    pool = PoolLectura(ruta)
+    servidor = await asyncio.start_server(
+        lambda reader, writer: atender(pool, reader, writer), host, puerto
+    )
+    print(f"🌐 API de libros escuchando en http://{host}:{puerto}")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        pool.cerrar()
+
+
+def main():
+    try:
+        asyncio.run(servir())
+    except KeyboardInterrupt:
+        print("👋 API detenida.")
+
+
+if __name__ == "__main__":
+    main()
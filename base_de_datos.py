@@ -1,155 +1,814 @@
 import os
+import json
 import time
+import queue
+import threading
+import multiprocessing
 import requests
-import sqlite3
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from cache_http import RUTA_CACHE_HTTP, CacheHTTP, huella
+from conexion_db import (
+    RUTA_DB,
+    conectar_db,
+    extraer_stock_disponible,
+    precio_a_peniques,
+    preparar_db,
+)
+from parseo_html import VERSION_EXTRACCION, parsear
 
 # --- Cargar variables de entorno ---
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_BOOKS_API_KEY")
 
 # --- Variables ---
-BASE_URL = "http://books.toscrape.com/"
+# Configurables para apuntar a servidor_simulado.py u otro espejo local
+BASE_URL = os.getenv("SCRAPER_BASE_URL", "http://books.toscrape.com/").rstrip("/") + "/"
 CATALOGUE_URL = BASE_URL + "catalogue/"
+GOOGLE_BOOKS_URL = os.getenv(
+    "GOOGLE_BOOKS_URL", "https://www.googleapis.com/books/v1/volumes"
+)
 headers = {"User-Agent": "Mozilla/5.0"}
+
+# --- Cache de autores (persistida en la tabla cache_autores) ---
+CACHE_AUTORES_TTL = float(os.getenv("CACHE_AUTORES_TTL_DIAS", "30")) * 86400
+CACHE_AUTORES_TTL_NEGATIVO = (
+    float(os.getenv("CACHE_AUTORES_TTL_NEGATIVO_DIAS", "1")) * 86400
+)
 cache_autores = {}
+autores_pendientes = []  # búsquedas nuevas aún no guardadas en la base
+lock_autores = threading.Lock()
 
-# --- Conectar a la base de datos ---
-conn = sqlite3.connect("libros.db")
-cursor = conn.cursor()
+# --- Concurrencia (SCRAPER_MAX_WORKERS=1 vuelve al modo secuencial) ---
+MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", "8"))
+MAX_POR_HOST = int(os.getenv("SCRAPER_MAX_POR_HOST", "4"))
+MAX_CATEGORIAS = int(os.getenv("SCRAPER_MAX_CATEGORIAS", "4"))
 
-# --- Crear tablas ---
-cursor.executescript(
-    """
-CREATE TABLE IF NOT EXISTS autores (
-    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-    nombre TEXT UNIQUE NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS generos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-    nombre TEXT UNIQUE NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS libros (
-    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-    titulo TEXT NOT NULL,
-    precio TEXT NOT NULL,
-    stock TEXT NOT NULL,
-    url TEXT NOT NULL,
-    rating INTEGER NOT NULL,
-    genero_id INTEGER NOT NULL,
-    FOREIGN KEY (genero_id) REFERENCES generos(id)
-);
-
-CREATE TABLE IF NOT EXISTS autor_libro (
-    autor_id INTEGER NOT NULL,
-    libro_id INTEGER NOT NULL,
-    PRIMARY KEY (autor_id, libro_id),
-    FOREIGN KEY (autor_id) REFERENCES autores(id),
-    FOREIGN KEY (libro_id) REFERENCES libros(id)
-);
-"""
+# --- Reanudación: páginas de listado que fallaron se reintentan hasta N veces ---
+MAX_INTENTOS = int(os.getenv("SCRAPER_MAX_INTENTOS", "3"))
+# Estados de la frontera que no se retoman: hecho, página de listado omitida
+# tras MAX_INTENTOS y categoría cerrada con alguna página omitida
+ESTADOS_TERMINALES = ("hecho", "omitido", "con_error")
+
+# --- Parseo en procesos (0 = en el mismo hilo que descarga) ---
+PROCESOS_PARSEO = int(os.getenv("SCRAPER_PROCESOS_PARSEO", "0"))
+# Páginas descargadas esperando parser; al llegar al tope las descargas esperan
+PARSEOS_PENDIENTES = int(
+    os.getenv("SCRAPER_PARSEOS_PENDIENTES", str(2 * max(PROCESOS_PARSEO, 1)))
 )
+pool_parseo = None
+cache_http = None
+limite_parseo = threading.BoundedSemaphore(PARSEOS_PENDIENTES)
+
+# --- Modo incremental: solo se visitan libros nuevos o con cambios ---
+INCREMENTAL = os.getenv("SCRAPER_INCREMENTAL", "0") == "1"
+
+# --- Escritura en lotes (un commit por lote) ---
+TAMANO_LOTE = int(os.getenv("SCRAPER_TAMANO_LOTE", "500"))
+# Libros en la cola hacia el hilo escritor; llena, las descargas esperan
+COLA_ESCRITURA = int(os.getenv("SCRAPER_COLA_ESCRITURA", "1000"))
+# Libros pedidos por categoría que aún no se entregaron al escritor
+LIBROS_EN_VUELO = int(os.getenv("SCRAPER_LIBROS_EN_VUELO", "40"))
+
+# --- Pool de conexiones HTTP ---
+POOL_HOSTS = int(os.getenv("SCRAPER_POOL_HOSTS", "10"))
+POOL_POR_HOST = int(os.getenv("SCRAPER_POOL_POR_HOST", str(MAX_POR_HOST)))
+
+# --- Límite de peticiones por segundo por host (0 = sin límite) ---
+LIMITE_TOSCRAPE_RPS = float(os.getenv("LIMITE_TOSCRAPE_RPS", "0"))
+LIMITE_TOSCRAPE_RAFAGA = int(os.getenv("LIMITE_TOSCRAPE_RAFAGA", "10"))
+LIMITE_GOOGLE_RPS = float(os.getenv("LIMITE_GOOGLE_RPS", "5"))
+LIMITE_GOOGLE_RAFAGA = int(os.getenv("LIMITE_GOOGLE_RAFAGA", "5"))
+
+# --- Métricas por etapa (se guardan en JSON si se define la ruta) ---
+RUTA_METRICAS = os.getenv("SCRAPER_METRICAS")
+
+# --- Conexión a la base de datos (se abre en inicializar_db) ---
+conn = None
+cursor = None
+
+
+def inicializar_db(ruta=RUTA_DB):
+    global conn, cursor
+    # Durante el crawl la usa solo el hilo de EscritorLibros
+    conn = conectar_db(ruta, check_same_thread=False)
+    preparar_db(conn)
+    cursor = conn.cursor()
+    cargar_ids()
+
+# --- Cache nombre -> id de géneros y autores (se completa al insertar) ---
+ids_por_tabla = {"generos": {}, "autores": {}}
 
 RATING_MAP = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
+# Género y stock de un libro nuevo cuyo detalle no se pudo descargar
+DETALLE_DESCONOCIDO = ("Desconocido", "Sin stock")
+
+
+# --- Métricas ---
+def percentil(ordenados, p):
+    # Percentil por rango más cercano sobre una lista ya ordenada
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Metricas:
+    """Duraciones por etapa y contadores, seguros entre hilos.
+
+    medir() sirve como bloque with o como decorador:
+
+        with metricas.medir("parseo detalle"):
+            ...
+    """
+
+    def __init__(self):
+        self.tiempos = defaultdict(list)
+        self.contadores = defaultdict(int)
+        self.lock = threading.Lock()
+        self.inicio = time.perf_counter()
+
+    def iniciar(self):
+        with self.lock:
+            self.tiempos.clear()
+            self.contadores.clear()
+            self.inicio = time.perf_counter()
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio)
+
+    def registrar(self, etapa, segundos):
+        with self.lock:
+            self.tiempos[etapa].append(segundos)
+
+    def contar(self, nombre, cantidad=1):
+        with self.lock:
+            self.contadores[nombre] += cantidad
+
+    def resumen(self):
+        with self.lock:
+            tiempos = {etapa: sorted(v) for etapa, v in self.tiempos.items()}
+            contadores = dict(self.contadores)
+        segundos = time.perf_counter() - self.inicio
+        libros = contadores.get("libros_guardados", 0)
+        return {
+            "segundos": segundos,
+            "libros_por_segundo": libros / segundos if segundos else 0,
+            "contadores": contadores,
+            "etapas": {
+                etapa: {
+                    "n": len(v),
+                    "total": sum(v),
+                    "p50": percentil(v, 50),
+                    "p95": percentil(v, 95),
+                    "p99": percentil(v, 99),
+                    "max": v[-1],
+                }
+                for etapa, v in tiempos.items()
+            },
+        }
+
+    def guardar(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.resumen(), f, indent=2)
+
+
+metricas = Metricas()
+
+
+# --- Cliente HTTP ---
+class LimitadorTasa:
+    """Token bucket: `tasa` peticiones por segundo con ráfagas de hasta `rafaga`."""
+
+    def __init__(self, tasa, rafaga=1):
+        self.tasa = tasa
+        self.rafaga = max(1, rafaga)
+        self._tokens = self.rafaga
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reservar(self):
+        # Toma un token (el saldo puede quedar negativo) y devuelve cuánto
+        # hay que esperar; así las esperas quedan en orden de llegada.
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(
+                self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa
+            )
+            self._ultimo = ahora
+            self._tokens -= 1
+            return -self._tokens / self.tasa if self._tokens < 0 else 0
+
+    def adquirir(self):
+        espera = self._reservar()
+        if espera:
+            time.sleep(espera)
+
+
+class ClienteCrawler:
+    """Sesión HTTP compartida (keep-alive, gzip) para todas las peticiones."""
+
+    def __init__(
+        self,
+        pool_hosts=POOL_HOSTS,
+        pool_por_host=POOL_POR_HOST,
+        max_por_host=MAX_POR_HOST,
+        limites=None,
+    ):
+        self.sesion = requests.Session()
+        self.sesion.headers.update(headers)
+        self.sesion.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        )
+        # pool_block evita abrir conexiones extra que luego se descartan
+        adaptador = HTTPAdapter(
+            pool_connections=pool_hosts, pool_maxsize=pool_por_host, pool_block=True
+        )
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+        self.max_por_host = max_por_host
+        # limites: {host: (peticiones_por_segundo, rafaga)}
+        self.limitadores = {
+            host: LimitadorTasa(tasa, rafaga)
+            for host, (tasa, rafaga) in (limites or {}).items()
+            if tasa > 0
+        }
+        self._semaforos = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def limitar_host(self, url):
+        # Limita las peticiones simultáneas contra un mismo host
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.max_por_host)
+            semaforo = self._semaforos[host]
+        with semaforo:
+            yield
+
+    def get(self, url, **kwargs):
+        host = urlsplit(url).netloc
+        limitador = self.limitadores.get(host)
+        esperando = time.perf_counter()
+        if limitador:
+            limitador.adquirir()
+        with self.limitar_host(url):
+            # espera = token bucket + semáforo; descarga = petición completa
+            metricas.registrar(f"espera {host}", time.perf_counter() - esperando)
+            with metricas.medir(f"descarga {host}"):
+                return self.sesion.get(url, **kwargs)
+
+    def cerrar(self):
+        self.sesion.close()
+
+
+def limites_por_host(limites):
+    # [(url, tasa, rafaga)] -> {host: (tasa, rafaga)}. Si dos servicios
+    # comparten host (p. ej. el sitio simulado sirve también la API) queda el
+    # límite más estricto; tasa 0 significa sin límite.
+    por_host = {}
+    for url, tasa, rafaga in limites:
+        host = urlsplit(url).netloc
+        limite = (tasa, rafaga)
+        previo = por_host.get(host)
+        if previo and previo[0] > 0 and (tasa <= 0 or previo < limite):
+            limite = previo
+        por_host[host] = limite
+    return por_host
+
+
+cliente = ClienteCrawler(
+    limites=limites_por_host(
+        [
+            (BASE_URL, LIMITE_TOSCRAPE_RPS, LIMITE_TOSCRAPE_RAFAGA),
+            (GOOGLE_BOOKS_URL, LIMITE_GOOGLE_RPS, LIMITE_GOOGLE_RAFAGA),
+        ]
+    )
+)
 
 
 # --- Funciones ---
+def cargar_cache_autores():
+    # Solo se cargan las entradas vigentes; las vencidas se vuelven a consultar
+    ahora = time.time()
+    cursor.execute(
+        """
+        SELECT titulo, autores FROM cache_autores
+        WHERE (estado = 'ok' AND obtenido_en >= ?)
+           OR (estado != 'ok' AND obtenido_en >= ?)
+    """,
+        (ahora - CACHE_AUTORES_TTL, ahora - CACHE_AUTORES_TTL_NEGATIVO),
+    )
+    cache_autores.update(cursor.fetchall())
+    print(f"🗂️ Autores en cache: {len(cache_autores)}")
+
+
+def guardar_cache_autores():
+    with lock_autores:
+        pendientes = autores_pendientes[:]
+        autores_pendientes.clear()
+    if pendientes:
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO cache_autores (titulo, autores, estado, obtenido_en)
+            VALUES (?, ?, ?, ?)
+        """,
+            pendientes,
+        )
+        conn.commit()
+
+
+def incrementar_generacion_crawl():
+    # Los lectores (cache del visor) comparan este contador para saber si
+    # terminó un crawl nuevo desde que guardaron sus resultados.
+    cursor.execute(
+        """
+        INSERT INTO metadatos (clave, valor) VALUES ('generacion_crawl', 1)
+        ON CONFLICT(clave) DO UPDATE SET valor = valor + 1
+    """
+    )
+    conn.commit()
+
+
+@metricas.medir("autores")
 def buscar_autor_google_books(titulo):
     if titulo in cache_autores:
         return cache_autores[titulo]
 
-    url = "https://www.googleapis.com/books/v1/volumes"
     params = {"q": f"intitle:{titulo}", "key": API_KEY, "maxResults": 1}
 
     try:
-        response = requests.get(url, params=params, timeout=5)
+        response = cliente.get(GOOGLE_BOOKS_URL, params=params, timeout=5)
         response.raise_for_status()
         data = response.json()
         if "items" in data:
             volumen = data["items"][0]["volumeInfo"]
             autores = volumen.get("authors", ["Desconocido"])
             autor = ", ".join(autores)
+            estado = "ok"
         else:
             autor = "No encontrado"
+            estado = "no_encontrado"
     except Exception:
         autor = "Error API"
+        estado = "error"
 
     cache_autores[titulo] = autor
-    time.sleep(1)
+    with lock_autores:
+        autores_pendientes.append((titulo, autor, estado, time.time()))
     return autor
 
 
+def parsear_respuesta(tipo, contenido, codificacion):
+    # Sin pool se parsea aquí; con pool, los bytes crudos van a otro proceso
+    # y este hilo solo espera el registro ya extraído (sin tomar el GIL).
+    with metricas.medir(f"parseo {tipo}"):
+        if pool_parseo is None:
+            return parsear(tipo, contenido, codificacion)
+        with limite_parseo:
+            return pool_parseo.submit(parsear, tipo, contenido, codificacion).result()
+
+
+def obtener_pagina(tipo, url, timeout):
+    """Descarga y extrae una página de listado o de libro; None si da 404.
+
+    Con la cache HTTP activa se piden con If-None-Match/If-Modified-Since:
+    un 304, o un cuerpo con la misma huella si el servidor no manda
+    validadores, devuelve lo extraído la vez anterior sin volver a parsear.
+    Si eso se extrajo con otra VERSION_EXTRACCION, se parsea el cuerpo
+    guardado (304) o el recibido.
+    """
+    entrada = cache_http.buscar(url) if cache_http else None
+    cabeceras = cache_http.cabeceras_condicionales(entrada) if entrada else None
+    response = cliente.get(url, timeout=timeout, headers=cabeceras)
+    if response.status_code == 304 and entrada:
+        metricas.contar("paginas_304")
+        extraido = entrada[3]
+        if extraido is None:
+            metricas.contar("paginas_reparseadas")
+            extraido = parsear_respuesta(tipo, *cache_http.cuerpo(url))
+        cache_http.revalidada(url, response, extraido)
+        return extraido
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+
+    # La misma que usaría response.text (si falta, la que adivina requests)
+    codificacion = response.encoding or response.apparent_encoding
+    huella_cuerpo = huella(response.content) if cache_http else None
+    if entrada and entrada[2] == huella_cuerpo:
+        metricas.contar("paginas_sin_cambios")
+        extraido = entrada[3]
+        if extraido is None:
+            metricas.contar("paginas_reparseadas")
+            extraido = parsear_respuesta(tipo, response.content, codificacion)
+        cache_http.revalidada(url, response, extraido)
+        return extraido
+
+    extraido = parsear_respuesta(tipo, response.content, codificacion)
+    if cache_http:
+        cache_http.guardar(url, response, huella_cuerpo, codificacion, extraido)
+    return extraido
+
+
+def url_absoluta_libro(url_relativa):
+    return CATALOGUE_URL + url_relativa.lstrip("./")
+
+
 def obtener_detalle_libro(url_relativa):
-    url_libro = CATALOGUE_URL + url_relativa.lstrip("./")
+    # (genero, stock, url). Si la página no se pudo descargar, genero y stock
+    # son None: guardar_lote no pisa lo guardado y la frontera la reintenta.
+    url_libro = url_absoluta_libro(url_relativa)
 
     try:
-        detalle = requests.get(url_libro, headers=headers, timeout=5)
-        detalle.raise_for_status()
-        soup = BeautifulSoup(detalle.text, "html.parser")
-
-        # Género
-        breadcrumb = soup.select("ul.breadcrumb li a")
-        genero = breadcrumb[2].text.strip() if len(breadcrumb) >= 3 else "Desconocido"
-
-        # Stock
-        tabla = soup.find("table", class_="table table-striped")
-        stock = (
-            tabla.find_all("tr")[5].find("td").text.strip() if tabla else "Sin stock"
-        )
+        # Género (breadcrumb) y stock (tabla de producto)
+        detalle = obtener_pagina("detalle", url_libro, timeout=5)
     except Exception:
-        genero = "Desconocido"
-        stock = "Sin stock"
+        detalle = None
+    if detalle is None:
+        return None, None, url_libro
+
+    genero, stock = detalle
+    return genero or "Desconocido", stock or "Sin stock", url_libro
+
+
+def cargar_ids():
+    for tabla, ids in ids_por_tabla.items():
+        cursor.execute(f"SELECT nombre, id FROM {tabla}")
+        ids.update(cursor.fetchall())
+
+
+def obtener_o_insertar_ids(nombres, tabla):
+    # Devuelve la cache nombre -> id de la tabla; solo toca la base para los
+    # nombres que todavía no están en ella.
+    # dict.fromkeys conserva el orden de aparición: los ids no dependen del
+    # hash de los strings (que cambia en cada proceso).
+    ids = ids_por_tabla[tabla]
+    faltantes = list(dict.fromkeys(n for n in nombres if n not in ids))
+    if faltantes:
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO {tabla} (nombre) VALUES (?)",
+            [(n,) for n in faltantes],
+        )
+        marcadores = ", ".join("?" * len(faltantes))
+        cursor.execute(
+            f"SELECT nombre, id FROM {tabla} WHERE nombre IN ({marcadores})",
+            faltantes,
+        )
+        ids.update(cursor.fetchall())
+    return ids
+
+
+def cargar_libros_conocidos():
+    # url -> (precio, rating) tal como aparecen en el listado
+    cursor.execute("SELECT url, precio, rating FROM libros")
+    return {url: (precio, rating) for url, precio, rating in cursor.fetchall()}
+
+
+UPSERT_LIBRO = """
+    INSERT INTO libros (
+        titulo, precio, stock, url, rating, genero_id,
+        precio_peniques, stock_disponible
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+        precio = excluded.precio,
+        stock = excluded.stock,
+        genero_id = excluded.genero_id,
+        rating = excluded.rating,
+        precio_peniques = excluded.precio_peniques,
+        stock_disponible = excluded.stock_disponible
+"""
+
+
+def valores_upsert(libro, ids_generos):
+    _, titulo, precio, genero, stock, url, rating = libro
+    return (
+        titulo,
+        precio,
+        stock,
+        url,
+        rating,
+        ids_generos[genero],
+        precio_a_peniques(precio),
+        extraer_stock_disponible(stock),
+    )
+
+
+def separar_autores(autor_str):
+    return [a.strip() for a in autor_str.split(",")]
+
+
+@metricas.medir("escritura")
+def guardar_lote(lote):
+    # Un lote en una transacción; devuelve (insertados, actualizados, omitidos)
+    omitidos = 0
+    # Búsqueda por el índice único de url
+    urls = list({libro[5] for libro in lote})
+    marcadores = ", ".join("?" * len(urls))
+    cursor.execute(
+        f"""
+        SELECT libros.url, libros.precio, libros.stock, libros.rating, generos.nombre
+        FROM libros LEFT JOIN generos ON generos.id = libros.genero_id
+        WHERE libros.url IN ({marcadores})
+    """,
+        urls,
+    )
+    existentes = {fila[0]: fila[1:] for fila in cursor.fetchall()}
 
-    return genero, stock, url_libro
+    nuevos = {}
+    cambios = {}
+    fallidos = set()  # detalle sin descargar (genero y stock None)
+    for libro in lote:
+        autor, titulo, precio, genero, stock, url, rating = libro
+        if stock is None:
+            fallidos.add(url)
+        if url in nuevos:
+            omitidos += 1
+        elif url in existentes and stock is None:
+            omitidos += 1  # se conserva lo guardado hasta poder leer el detalle
+        elif url in existentes and existentes[url] == (precio, stock, rating, genero):
+            omitidos += 1
+        elif url in existentes:
+            cambios[url] = libro
+            existentes[url] = (precio, stock, rating, genero)
+        elif stock is None:
+            # Libro nuevo: se guarda con valores provisorios
+            nuevos[url] = (autor, titulo, precio, *DETALLE_DESCONOCIDO, url, rating)
+        else:
+            nuevos[url] = libro
+
+    ids_generos = obtener_o_insertar_ids(
+        [libro[3] for libro in (*nuevos.values(), *cambios.values())], "generos"
+    )
+    ids_autores = obtener_o_insertar_ids(
+        [a for libro in nuevos.values() for a in separar_autores(libro[0])],
+        "autores",
+    )
+
+    relaciones = []
+    for libro in nuevos.values():
+        cursor.execute(UPSERT_LIBRO, valores_upsert(libro, ids_generos))
+        libro_id = cursor.lastrowid
+        relaciones.extend(
+            (ids_autores[a], libro_id) for a in separar_autores(libro[0])
+        )
+    cursor.executemany(
+        UPSERT_LIBRO,
+        [valores_upsert(libro, ids_generos) for libro in cambios.values()],
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO autor_libro (autor_id, libro_id) VALUES (?, ?)",
+        relaciones,
+    )
+    # Checkpoint: los detalles guardados en este lote quedan hechos; los que
+    # fallaron se reintentan hasta MAX_INTENTOS y después quedan omitidos
+    ahora = time.time()
+    cursor.executemany(
+        "UPDATE frontera SET estado = 'hecho', actualizado_en = ? WHERE url = ?",
+        [(ahora, url) for url in urls if url not in fallidos],
+    )
+    cursor.executemany(
+        """
+        UPDATE frontera SET
+            estado = CASE WHEN intentos + 1 >= ? THEN 'omitido' ELSE 'error' END,
+            intentos = intentos + 1, actualizado_en = ?
+        WHERE url = ?
+    """,
+        [(MAX_INTENTOS, ahora, url) for url in fallidos],
+    )
+    conn.commit()
+    return len(nuevos), len(cambios), omitidos
 
 
-def obtener_o_insertar_id(nombre, tabla):
-    cursor.execute(f"SELECT id FROM {tabla} WHERE nombre = ?", (nombre,))
-    resultado = cursor.fetchone() #averiguar
-    if resultado:
-        return resultado[0]
-    cursor.execute(f"INSERT INTO {tabla} (nombre) VALUES (?)", (nombre,))
-    return cursor.lastrowid # averiguar
+def insertar_libros(libros, tamano_lote=TAMANO_LOTE):
+    """Guarda tuplas (autor, titulo, precio, genero, stock, url, rating) en
+    lotes, con un commit por lote. La url identifica al libro: si ya existe
+    se actualizan precio, stock y rating.
+    Devuelve (insertados, actualizados, omitidos)."""
+    totales = (0, 0, 0)
+    libros = iter(libros)
 
+    # libros puede ser un generador que descarga mientras se consume (modo
+    # secuencial): la etapa "escritura" mide solo guardar_lote.
+    while True:
+        lote = list(islice(libros, tamano_lote))
+        if not lote:
+            break
+        totales = tuple(map(sum, zip(totales, guardar_lote(lote))))
 
-def insertar_libro(autor_str, titulo, precio, genero_str, stock, url, rating):
-    cursor.execute("SELECT id FROM libros WHERE titulo = ? AND url = ?", (titulo, url))
-    if cursor.fetchone():
-        print(f"🔁 Libro duplicado ignorado: {titulo}")
-        return
+    insertados, actualizados, omitidos = totales
+    metricas.contar("libros_guardados", insertados + actualizados)
+    metricas.contar("libros_omitidos", omitidos)
+    return totales
 
-    genero_id = obtener_o_insertar_id(genero_str, "generos")
 
+# --- Frontera del crawl ---
+def contar_pendientes_frontera():
+    cursor.execute(
+        "SELECT COUNT(*) FROM frontera WHERE estado NOT IN (?, ?, ?)",
+        ESTADOS_TERMINALES,
+    )
+    return cursor.fetchone()[0]
+
+
+def cargar_frontera():
+    """Lo que quedó sin terminar del crawl anterior, por categoría:
+    {categoria: {"url", "estado", "listados": {url: (estado, intentos, datos)},
+    "detalles": {url_listado: [datos, ...]}}}. None si no hay nada pendiente."""
+    cursor.execute("UPDATE frontera SET estado = 'pendiente' WHERE estado = 'en_curso'")
+    # Páginas que ya agotaron sus intentos (también si bajó SCRAPER_MAX_INTENTOS)
     cursor.execute(
         """
-        INSERT INTO libros (titulo, precio, stock, url, rating, genero_id)
-        VALUES (?, ?, ?, ?, ?, ?)
+        UPDATE frontera SET estado = 'omitido'
+        WHERE estado = 'error' AND intentos >= ?
     """,
-        (titulo, precio, stock, url, rating, genero_id),
+        (MAX_INTENTOS,),
     )
-    libro_id = cursor.lastrowid
+    pendientes = contar_pendientes_frontera()
+    if not pendientes:
+        cursor.execute("DELETE FROM frontera")
+        conn.commit()
+        return None
+    conn.commit()
+
+    frontera = {}
+    cursor.execute(
+        """
+        SELECT url, tipo, categoria, estado, intentos, origen, datos FROM frontera
+        WHERE tipo != 'detalle' OR estado NOT IN ('hecho', 'omitido')
+    """
+    )
+    for url, tipo, categoria, estado, intentos, origen, datos in cursor.fetchall():
+        entrada = frontera.setdefault(
+            categoria,
+            {
+                "url": None,
+                "estado": None,
+                "listados": {},
+                "detalles": defaultdict(list),
+            },
+        )
+        if tipo == "categoria":
+            entrada["url"], entrada["estado"] = url, estado
+        elif tipo == "listado":
+            entrada["listados"][url] = (estado, intentos, datos)
+        else:
+            entrada["detalles"][origen].append(tuple(json.loads(datos)))
+    print(f"♻️ Reanudando el crawl anterior: {pendientes} URLs pendientes")
+    return frontera
+
+
+def registrar_categorias(categorias):
+    # Crawl nuevo: estado e intentos empiezan de cero
+    cursor.executemany(
+        """
+        INSERT INTO frontera (url, tipo, categoria, actualizado_en)
+        VALUES (?, 'categoria', ?, ?)
+        ON CONFLICT(url) DO UPDATE SET
+            estado = 'pendiente', intentos = 0,
+            actualizado_en = excluded.actualizado_en
+    """,
+        [(url, nombre, time.time()) for nombre, url in categorias.items()],
+    )
+    conn.commit()
+
+
+def marcar_categoria_en_curso(categoria):
+    cursor.execute(
+        """
+        UPDATE frontera SET estado = 'en_curso', intentos = intentos + 1,
+            actualizado_en = ?
+        WHERE tipo = 'categoria' AND categoria = ?
+    """,
+        (time.time(), categoria),
+    )
+    conn.commit()
+
+
+def registrar_pagina(categoria, url_pagina, libros, fin=False):
+    # Los libros de la página quedan pendientes y la página hecha en la misma
+    # transacción: al reanudar no hace falta volver a pedir el listado.
+    # fin=True marca la página que cerró la categoría (404 o vacía).
+    ahora = time.time()
+    cursor.executemany(
+        """
+        INSERT OR IGNORE INTO frontera
+            (url, tipo, categoria, origen, datos, actualizado_en)
+        VALUES (?, 'detalle', ?, ?, ?, ?)
+    """,
+        [
+            (
+                url_absoluta_libro(libro[3]),
+                categoria,
+                url_pagina,
+                json.dumps(libro),
+                ahora,
+            )
+            for libro in libros
+        ],
+    )
+    cursor.execute(
+        """
+        INSERT INTO frontera (url, tipo, categoria, estado, datos, actualizado_en)
+        VALUES (?, 'listado', ?, 'hecho', ?, ?)
+        ON CONFLICT(url) DO UPDATE SET
+            estado = 'hecho', datos = excluded.datos,
+            actualizado_en = excluded.actualizado_en
+    """,
+        (url_pagina, categoria, "fin" if fin else None, ahora),
+    )
+    conn.commit()
+
+
+def marcar_pagina_con_error(categoria, url_pagina):
+    # Al llegar a MAX_INTENTOS la página queda omitida y no se reintenta más
+    cursor.execute(
+        """
+        INSERT INTO frontera
+            (url, tipo, categoria, estado, intentos, actualizado_en)
+        VALUES (:url, 'listado', :categoria,
+            CASE WHEN :max <= 1 THEN 'omitido' ELSE 'error' END, 1, :ahora)
+        ON CONFLICT(url) DO UPDATE SET
+            estado = CASE WHEN intentos + 1 >= :max THEN 'omitido' ELSE 'error' END,
+            intentos = intentos + 1, actualizado_en = excluded.actualizado_en
+    """,
+        {
+            "url": url_pagina,
+            "categoria": categoria,
+            "max": MAX_INTENTOS,
+            "ahora": time.time(),
+        },
+    )
+    conn.commit()
+
 
-    for nombre_autor in [a.strip() for a in autor_str.split(",")]:
-        autor_id = obtener_o_insertar_id(nombre_autor, "autores")
+def cerrar_categoria_frontera(categoria):
+    # Sin detalles por reintentar: con_error si se omitió alguna página de
+    # listado o de detalle, hecha si se llegó a la última página; si no,
+    # sigue pendiente.
+    cursor.execute(
+        """
+        UPDATE frontera SET actualizado_en = :ahora, estado = CASE
+            WHEN EXISTS (
+                SELECT 1 FROM frontera AS f
+                WHERE f.categoria = :categoria AND f.tipo = 'detalle'
+                  AND f.estado NOT IN ('hecho', 'omitido')
+            ) THEN 'pendiente'
+            WHEN EXISTS (
+                SELECT 1 FROM frontera AS f
+                WHERE f.categoria = :categoria AND f.tipo != 'categoria'
+                  AND f.estado = 'omitido'
+            ) THEN 'con_error'
+            WHEN EXISTS (
+                SELECT 1 FROM frontera AS f
+                WHERE f.categoria = :categoria AND f.tipo = 'listado'
+                  AND f.datos = 'fin' AND f.estado = 'hecho'
+            ) THEN 'hecho'
+            ELSE 'pendiente' END
+        WHERE tipo = 'categoria' AND categoria = :categoria
+    """,
+        {"ahora": time.time(), "categoria": categoria},
+    )
+    conn.commit()
+
+
+def finalizar_frontera():
+    pendientes = contar_pendientes_frontera()
+    if pendientes:
+        print(f"♻️ Quedan {pendientes} URLs pendientes para la próxima ejecución")
+    else:
+        # Las páginas omitidas no bloquean: el próximo crawl empieza de cero
         cursor.execute(
-            """
-            INSERT OR IGNORE INTO autor_libro (autor_id, libro_id)
-            VALUES (?, ?)
-        """,
-            (autor_id, libro_id),
+            "SELECT categoria, url FROM frontera WHERE estado = 'omitido' ORDER BY url"
         )
+        for categoria, url in cursor.fetchall():
+            print(f"⚠️ {categoria}: {url} omitida tras {MAX_INTENTOS} intentos")
+        cursor.execute("DELETE FROM frontera")
+        conn.commit()
+    return pendientes
+
 
-    conn.commit() #commit
-    print(f"✅ Insertado: {titulo}")
+def ejecutar_ahora(funcion, *args):
+    return funcion(*args)
 
 
 def obtener_categorias():
     categorias = {}
     try:
-        response = requests.get(BASE_URL, headers=headers, timeout=10)
+        response = cliente.get(BASE_URL, timeout=10)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, "html.parser")
         links = soup.select("div.side_categories ul li ul li a")
@@ -162,8 +821,36 @@ def obtener_categorias():
     return categorias
 
 
-def obtener_libros_de_categoria(nombre_categoria, url_categoria):
-    libros = []
+def completar_libro(pendiente, executor=None):
+    autor, titulo, precio, detalle, rating_numero = pendiente
+    if executor:
+        autor, detalle = autor.result(), detalle.result()
+    genero, stock, url_completo = detalle
+    return (autor, titulo, precio, genero, stock, url_completo, rating_numero)
+
+
+def recorrer_categoria(
+    nombre_categoria,
+    url_categoria,
+    executor=None,
+    conocidos=None,
+    en_vuelo=LIBROS_EN_VUELO,
+    frontera=None,
+    registrar=None,
+):
+    # Generador: entrega cada libro apenas están su detalle y su autor, en el
+    # orden de las páginas del listado. Con executor mantiene como mucho
+    # en_vuelo libros pedidos y sin entregar, así la memoria no crece con el
+    # tamaño de la categoría.
+    # Con conocidos (modo incremental) se saltan los libros sin cambios.
+    # Con frontera (ver cargar_frontera) las páginas ya hechas no se piden de
+    # nuevo, y registrar(funcion, *args) guarda el avance en la base.
+    visitado = (frontera or {}).get(nombre_categoria, {})
+    listados = visitado.get("listados", {})
+    detalles_pendientes = visitado.get("detalles", {})
+    registrar = registrar or (lambda funcion, *args: None)
+    pendientes = deque()
+    sin_cambios = 0
     pagina = 1
 
     while True:
@@ -172,46 +859,270 @@ def obtener_libros_de_categoria(nombre_categoria, url_categoria):
             if pagina > 1
             else url_categoria + "index.html"
         )
-        try:
-            response = requests.get(url_pagina, headers=headers, timeout=10)
-            if response.status_code == 404:
+        estado, intentos, datos = listados.get(url_pagina, (None, 0, None))
+        if estado == "hecho":
+            if datos == "fin":
                 break
-            response.raise_for_status()
-        except Exception as e:
-            print(f"[!] Error en {nombre_categoria}, página {pagina}: {e}")
+            # Solo los libros de la página que todavía no se guardaron
+            libros = detalles_pendientes.get(url_pagina, [])
+        elif estado == "omitido":
+            print(
+                f"[!] {nombre_categoria}, página {pagina}: "
+                f"se omite tras {intentos} intentos"
+            )
             break
+        else:
+            try:
+                articulos = obtener_pagina("listado", url_pagina, timeout=10)
+            except Exception as e:
+                print(f"[!] Error en {nombre_categoria}, página {pagina}: {e}")
+                registrar(marcar_pagina_con_error, nombre_categoria, url_pagina)
+                break
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        articulos = soup.find_all("article", class_="product_pod")
-        if not articulos:
-            break
+            # 404 o página sin libros: fin de la categoría
+            if not articulos:
+                registrar(registrar_pagina, nombre_categoria, url_pagina, [], True)
+                break
 
-        for libro in articulos:
-            rating_texto = libro.find("p", class_="star-rating")["class"][1] #"class" y _
-            rating_numero = RATING_MAP.get(rating_texto, 0)
-            titulo = libro.h3.a["title"]
-            precio = libro.find("p", class_="price_color").text.replace("Â", "")
-            url_relativa = libro.h3.a["href"]
+            libros = []
+            for titulo, precio, rating_texto, url_relativa in articulos:
+                rating_numero = RATING_MAP.get(rating_texto, 0)
+                precio = precio.replace("Â", "")
 
-            genero, stock, url_completo = obtener_detalle_libro(url_relativa)
-            autor = buscar_autor_google_books(titulo)
+                if conocidos is not None and conocidos.get(
+                    url_absoluta_libro(url_relativa)
+                ) == (precio, rating_numero):
+                    sin_cambios += 1
+                    continue
+                libros.append((titulo, precio, rating_numero, url_relativa))
+            registrar(registrar_pagina, nombre_categoria, url_pagina, libros)
 
-            libros.append(
-                (autor, titulo, precio, genero, stock, url_completo, rating_numero)
-            )
+        for titulo, precio, rating_numero, url_relativa in libros:
+            if executor:
+                detalle = executor.submit(obtener_detalle_libro, url_relativa)
+                autor = executor.submit(buscar_autor_google_books, titulo)
+            else:
+                detalle = obtener_detalle_libro(url_relativa)
+                autor = buscar_autor_google_books(titulo)
+
+            pendientes.append((autor, titulo, precio, detalle, rating_numero))
 
+        while len(pendientes) > (en_vuelo if executor else 0):
+            yield completar_libro(pendientes.popleft(), executor)
         pagina += 1
 
-    return libros
+    if sin_cambios:
+        print(f"⏭️ {nombre_categoria}: {sin_cambios} libros sin cambios")
+    while pendientes:
+        yield completar_libro(pendientes.popleft(), executor)
 
 
-# --- Ejecución principal ---
-categorias = obtener_categorias()
+class EscritorLibros:
+    """Único hilo que escribe en SQLite durante el crawl.
+
+    Las categorías que se recorren en paralelo le pasan libros por una cola
+    acotada (si el escritor se atrasa, los productores esperan). Para que la
+    base quede igual que en modo secuencial, solo guarda la primera categoría
+    de orden que falta cerrar, en lotes de tamano_lote; las siguientes se
+    juntan en memoria hasta que les toca. esperar_turno() limita cuántas
+    categorías se adelantan a la que se está guardando.
+    """
+
+    def __init__(
+        self,
+        orden,
+        tamano_cola=COLA_ESCRITURA,
+        tamano_lote=TAMANO_LOTE,
+        adelantadas=2 * MAX_CATEGORIAS,
+    ):
+        self.cola = queue.Queue(tamano_cola)
+        self.tamano_lote = tamano_lote
+        self.orden = deque(orden)
+        self.terminadas = set()
+        self.pendientes = defaultdict(list)
+        self.totales = defaultdict(lambda: (0, 0, 0))
+        self.turnos = threading.Semaphore(adelantadas)
+        self.error = None
+        self.hilo = threading.Thread(
+            target=self._ejecutar, name="escritor-sqlite", daemon=True
+        )
+
+    def iniciar(self):
+        self.hilo.start()
+        return self
 
-for nombre, url_categoria in categorias.items():
-    print(f"\n📚 Categoría: {nombre}")
-    libros = obtener_libros_de_categoria(nombre, url_categoria)
-    for libro in libros:
-        insertar_libro(*libro)
+    def esperar_turno(self):
+        # Antes de empezar una categoría; cada categoría cerrada libera un turno
+        self.turnos.acquire()
 
-print("\n✅ Todos los libros insertados correctamente.")
+    def agregar(self, categoria, libro):
+        self.cola.put(("libro", categoria, libro))
+
+    def terminar_categoria(self, categoria):
+        self.cola.put(("fin", categoria, None))
+
+    def ejecutar(self, funcion, *args):
+        # Escrituras que no son libros (frontera), en orden con el resto
+        self.cola.put(("tarea", funcion, args))
+
+    def cerrar(self):
+        self.cola.put(None)
+        self.hilo.join()
+        if self.error:
+            raise self.error
+
+    def _ejecutar(self):
+        while True:
+            item = self.cola.get()
+            if item is None:
+                return
+            if self.error:
+                continue  # se sigue vaciando la cola para no bloquear
+            try:
+                self._procesar(*item)
+            except Exception as e:
+                self.error = e
+                # Nadie más espera turno: main deja de encolar categorías
+                self.turnos.release(len(self.orden) + 1)
+
+    def _procesar(self, tipo, categoria, libro):
+        if tipo == "tarea":
+            funcion, args = categoria, libro
+            funcion(*args)
+            return
+        if tipo == "libro":
+            self.pendientes[categoria].append(libro)
+        else:
+            self.terminadas.add(categoria)
+        while self.orden and self.orden[0] in self.terminadas:
+            self._cerrar_categoria(self.orden.popleft())
+        if self.orden and len(self.pendientes[self.orden[0]]) >= self.tamano_lote:
+            self._guardar(self.orden[0])
+
+    def _guardar(self, categoria):
+        resultado = insertar_libros(self.pendientes.pop(categoria, []))
+        totales = zip(self.totales[categoria], resultado)
+        self.totales[categoria] = tuple(map(sum, totales))
+
+    def _cerrar_categoria(self, categoria):
+        self._guardar(categoria)
+        self.terminadas.discard(categoria)
+        cerrar_categoria_frontera(categoria)
+        print(f"\n📚 Categoría: {categoria}")
+        mostrar_resumen(*self.totales.pop(categoria))
+        guardar_cache_autores()
+        self.turnos.release()
+
+
+def encolar_categoria(nombre, url_categoria, executor, conocidos, frontera, escritor):
+    escritor.ejecutar(marcar_categoria_en_curso, nombre)
+    libros = recorrer_categoria(
+        nombre,
+        url_categoria,
+        executor,
+        conocidos,
+        frontera=frontera,
+        registrar=escritor.ejecutar,
+    )
+    try:
+        for libro in libros:
+            escritor.agregar(nombre, libro)
+    finally:
+        escritor.terminar_categoria(nombre)
+
+
+def mostrar_resumen(insertados, actualizados, omitidos):
+    print(
+        f"✅ Insertados: {insertados} | 🔄 Actualizados: {actualizados}"
+        f" | 🔁 Duplicados ignorados: {omitidos}"
+    )
+
+
+def main():
+    global pool_parseo, cache_http
+    metricas.iniciar()
+    inicializar_db()
+    if PROCESOS_PARSEO > 0:
+        # spawn y no fork: los procesos se crean en el primer submit, con los
+        # hilos de descarga y el escritor ya corriendo, y un fork con hilos
+        # vivos puede quedar bloqueado en un lock copiado a medio tomar.
+        pool_parseo = ProcessPoolExecutor(
+            PROCESOS_PARSEO, mp_context=multiprocessing.get_context("spawn")
+        )
+    if RUTA_CACHE_HTTP:
+        cache_http = CacheHTTP(RUTA_CACHE_HTTP, VERSION_EXTRACCION)
+    cargar_cache_autores()
+    conocidos = cargar_libros_conocidos() if INCREMENTAL else None
+
+    # Si el crawl anterior se cortó, se sigue desde su frontera
+    frontera = cargar_frontera()
+    if frontera is None:
+        categorias = obtener_categorias()
+        registrar_categorias(categorias)
+        frontera = {}
+    else:
+        categorias = {
+            nombre: entrada["url"]
+            for nombre, entrada in frontera.items()
+            if entrada["url"] and entrada["estado"] not in ESTADOS_TERMINALES
+        }
+
+    if MAX_WORKERS <= 1:
+        # insertar_libros consume el generador de a lotes
+        for nombre, url_categoria in categorias.items():
+            print(f"\n📚 Categoría: {nombre}")
+            marcar_categoria_en_curso(nombre)
+            libros = recorrer_categoria(
+                nombre,
+                url_categoria,
+                conocidos=conocidos,
+                frontera=frontera,
+                registrar=ejecutar_ahora,
+            )
+            mostrar_resumen(*insertar_libros(libros))
+            cerrar_categoria_frontera(nombre)
+            guardar_cache_autores()
+    else:
+        # Pools separados: las tareas de categoría esperan a las de libros
+        escritor = EscritorLibros(list(categorias)).iniciar()
+        try:
+            with ThreadPoolExecutor(MAX_WORKERS) as pool_libros, ThreadPoolExecutor(
+                MAX_CATEGORIAS
+            ) as pool_categorias:
+                futuros = []
+                for nombre, url_categoria in categorias.items():
+                    escritor.esperar_turno()
+                    if escritor.error:
+                        break
+                    futuros.append(
+                        pool_categorias.submit(
+                            encolar_categoria,
+                            nombre,
+                            url_categoria,
+                            pool_libros,
+                            conocidos,
+                            frontera,
+                            escritor,
+                        )
+                    )
+                for futuro in futuros:
+                    futuro.result()
+        finally:
+            escritor.cerrar()
+
+    finalizar_frontera()
+    incrementar_generacion_crawl()
+    cliente.cerrar()
+    if cache_http is not None:
+        cache_http.cerrar()
+    if pool_parseo is not None:
+        pool_parseo.shutdown()
+    print("\n✅ Todos los libros insertados correctamente.")
+    if RUTA_METRICAS:
+        metricas.guardar(RUTA_METRICAS)
+        print(f"⏱️ Métricas guardadas en {RUTA_METRICAS}")
+
+
+# --- Ejecución principal ---
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+# --- Configuración ---
+# Tamaños del catálogo simulado; cada uno es una corrida con base nueva
+BENCH_TAMANOS = [
+    int(n) for n in os.getenv("BENCH_TAMANOS", "1000,10000,100000").split(",")
+]
+BENCH_LATENCIA = os.getenv("BENCH_LATENCIA", "0")  # segundos por respuesta
+BENCH_CATEGORIAS = os.getenv("BENCH_CATEGORIAS", "50")
+BENCH_SALIDA = os.getenv("BENCH_SALIDA", "benchmarks")  # carpeta de resultados
+BENCH_COMPARAR = os.getenv("BENCH_COMPARAR")  # JSON anterior para comparar
+BENCH_TOLERANCIA = float(os.getenv("BENCH_TOLERANCIA", "0.10"))  # 10 % más lento
+
+DIRECTORIO = Path(__file__).resolve().parent
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(base, intentos=50):
+    for _ in range(intentos):
+        try:
+            urllib.request.urlopen(base + "__estadisticas", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"El servidor simulado no respondió en {base}")
+
+
+def correr(tamano, carpeta):
+    # Servidor y crawler en procesos separados, como en producción: el GIL
+    # del servidor no se mezcla con las mediciones del crawler.
+    puerto = puerto_libre()
+    base = f"http://127.0.0.1:{puerto}/"
+    entorno = dict(os.environ)
+    entorno.update(
+        {
+            "SIMULADOR_LIBROS": str(tamano),
+            "SIMULADOR_CATEGORIAS": BENCH_CATEGORIAS,
+            "SIMULADOR_LATENCIA": BENCH_LATENCIA,
+            "SIMULADOR_PUERTO": str(puerto),
+        }
+    )
+    servidor = subprocess.Popen(
+        [sys.executable, str(DIRECTORIO / "servidor_simulado.py")],
+        env=entorno,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        esperar_servidor(base)
+        metricas = carpeta / f"metricas-{tamano}.json"
+        entorno.update(
+            {
+                "SCRAPER_BASE_URL": base,
+                "GOOGLE_BOOKS_URL": base + "books/v1/volumes",
+                "LIBROS_DB": str(carpeta / f"libros-{tamano}.db"),
+                # Cache HTTP nueva: se mide un crawl en frío
+                "SCRAPER_CACHE_HTTP": str(carpeta / f"cache-http-{tamano}.db"),
+                "SCRAPER_METRICAS": str(metricas),
+            }
+        )
+        # Sin límite hacia la API falsa salvo que se pida explícitamente
+        entorno.setdefault("LIMITE_GOOGLE_RPS", "0")
+        subprocess.run(
+            [sys.executable, str(DIRECTORIO / "base_de_datos.py")],
+            env=entorno,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        resultado = json.loads(metricas.read_text(encoding="utf-8"))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+    resultado["libros"] = tamano
+    return resultado
+
+
+def mostrar_corrida(corrida):
+    print(
+        f"\n📚 {corrida['libros']} libros: {corrida['segundos']:.1f} s"
+        f" | {corrida['libros_por_segundo']:.1f} libros/s"
+    )
+    print(
+        f"   {'etapa':<34}{'n':>8}{'total s':>10}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    )
+    for etapa, datos in sorted(corrida["etapas"].items()):
+        print(
+            f"   {etapa:<34}{datos['n']:>8}{datos['total']:>10.2f}"
+            f"{datos['p50'] * 1000:>9.2f}{datos['p95'] * 1000:>9.2f}"
+            f"{datos['p99'] * 1000:>9.2f}"
+        )
+
+
+def comparar(actual, ruta_anterior):
+    # Marca regresión si los libros/s bajan más que la tolerancia
+    anterior = json.loads(Path(ruta_anterior).read_text(encoding="utf-8"))
+    previas = {c["libros"]: c for c in anterior["corridas"]}
+    regresiones = 0
+    print(f"\n🔍 Comparación con {ruta_anterior}")
+    for corrida in actual["corridas"]:
+        previa = previas.get(corrida["libros"])
+        if not previa:
+            continue
+        cambio = corrida["libros_por_segundo"] / previa["libros_por_segundo"] - 1
+        regresion = cambio < -BENCH_TOLERANCIA
+        regresiones += regresion
+        print(
+            f"   {corrida['libros']:>7} libros: {previa['libros_por_segundo']:.1f}"
+            f" -> {corrida['libros_por_segundo']:.1f} libros/s ({cambio:+.1%})"
+            + ("  ⚠️ regresión" if regresion else "")
+        )
+    return regresiones
+
+
+def main():
+    salida = Path(BENCH_SALIDA)
+    salida.mkdir(parents=True, exist_ok=True)
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "configuracion": {
+            "latencia": float(BENCH_LATENCIA),
+            "categorias": int(BENCH_CATEGORIAS),
+            "variables": {
+                clave: valor
+                for clave, valor in os.environ.items()
+                if clave.startswith(("SCRAPER_", "LIMITE_", "SQLITE_"))
+            },
+        },
+        "corridas": [],
+    }
+
+    with tempfile.TemporaryDirectory() as temporal:
+        for tamano in BENCH_TAMANOS:
+            print(f"⏱️ Recorriendo catálogo simulado de {tamano} libros...")
+            corrida = correr(tamano, Path(temporal))
+            resultados["corridas"].append(corrida)
+            mostrar_corrida(corrida)
+
+    ruta = salida / f"crawl-{datetime.now():%Y%m%d-%H%M%S}.json"
+    ruta.write_text(json.dumps(resultados, indent=2), encoding="utf-8")
+    print(f"\n💾 Resultados guardados en {ruta}")
+
+    if BENCH_COMPARAR and comparar(resultados, BENCH_COMPARAR):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
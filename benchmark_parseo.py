@@ -0,0 +1,61 @@
+import os
+import time
+import parseo_html
+from servidor_simulado import pagina_detalle, pagina_listado
+
+# --- Configuración ---
+BENCH_REPETICIONES = int(os.getenv("BENCH_REPETICIONES", "200"))
+
+
+def medir(funcion, paginas, repeticiones=BENCH_REPETICIONES):
+    # Microsegundos por página (mejor de 3 para reducir ruido)
+    mejores = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for i in range(repeticiones):
+            funcion(paginas[i % len(paginas)])
+        mejores.append((time.perf_counter() - inicio) / repeticiones)
+    return min(mejores) * 1e6
+
+
+def main():
+    # Las páginas pasan por latin-1 igual que response.text en el crawler
+    listados = [
+        pagina_listado(c, 1).encode("utf-8").decode("latin-1") for c in (0, 1)
+    ]
+    detalles = [pagina_detalle(n).encode("utf-8").decode("latin-1") for n in range(10)]
+
+    disponibles = [
+        nombre
+        for nombre in parseo_html.BACKENDS
+        if nombre != "lxml" or parseo_html.lxml is not None
+    ]
+    referencia = "bs4-completo"
+    esperado = (
+        [parseo_html.extraer_listado(p, referencia) for p in listados],
+        [parseo_html.extraer_detalle(p, referencia) for p in detalles],
+    )
+
+    print(f"{'parser':<16}{'listado µs':>12}{'detalle µs':>12}{'mejora':>9}")
+    base = None
+    for nombre in [referencia] + [n for n in disponibles if n != referencia]:
+        obtenido = (
+            [parseo_html.extraer_listado(p, nombre) for p in listados],
+            [parseo_html.extraer_detalle(p, nombre) for p in detalles],
+        )
+        if obtenido != esperado:
+            print(f"❌ {nombre} extrae datos distintos a {referencia}")
+            continue
+        listado = medir(lambda p: parseo_html.extraer_listado(p, nombre), listados)
+        detalle = medir(lambda p: parseo_html.extraer_detalle(p, nombre), detalles)
+        # Un libro cuesta un detalle y 1/20 de página de listado
+        por_libro = detalle + listado / 20
+        base = base or por_libro
+        print(f"{nombre:<16}{listado:>12.0f}{detalle:>12.0f}{base / por_libro:>8.1f}x")
+
+    if parseo_html.lxml is None:
+        print("ℹ️ lxml no está instalado (pip install lxml) y no se midió.")
+
+
+if __name__ == "__main__":
+    main()
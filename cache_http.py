@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from conexion_db import conectar_db
+
+# --- Cache de respuestas HTTP ("" la desactiva) ---
+RUTA_CACHE_HTTP = os.getenv("SCRAPER_CACHE_HTTP", "cache_http.db")
+# Escrituras acumuladas antes de cada commit (la cache se puede perder sin daño)
+COMMIT_CADA = int(os.getenv("SCRAPER_CACHE_HTTP_COMMIT", "200"))
+
+# Si cambia, la tabla se descarta y se vuelve a crear (es solo una cache)
+VERSION_ESQUEMA = 2
+ESQUEMA_CACHE = """
+CREATE TABLE IF NOT EXISTS respuestas (
+    url TEXT PRIMARY KEY NOT NULL,
+    etag TEXT,
+    ultima_modificacion TEXT,
+    huella TEXT NOT NULL,          -- blake2b del cuerpo
+    cuerpo BLOB NOT NULL,          -- comprimido con zlib
+    codificacion TEXT,
+    extraido TEXT NOT NULL,        -- JSON de lo que devolvió parseo_html
+    version INTEGER NOT NULL,      -- parseo_html.VERSION_EXTRACCION al extraer
+    obtenido_en REAL NOT NULL,
+    revalidado_en REAL NOT NULL
+);
+"""
+
+
+def huella(contenido):
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+class CacheHTTP:
+    """Cuerpos de páginas ya descargadas con sus validadores (ETag y
+    Last-Modified) y los datos que se extrajeron de ellas.
+
+    Lo extraído solo se reutiliza si se obtuvo con la misma versión de la
+    extracción; si no, buscar() lo devuelve como None y el cuerpo guardado
+    permite volver a parsear sin descargar la página.
+
+    Compartida entre los hilos del crawler: una sola conexión protegida con
+    un lock y commits cada COMMIT_CADA escrituras.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE_HTTP, version=0, commit_cada=COMMIT_CADA):
+        self.conn = conectar_db(ruta, check_same_thread=False)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != VERSION_ESQUEMA:
+            self.conn.execute("DROP TABLE IF EXISTS respuestas")
+            self.conn.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+        self.conn.executescript(ESQUEMA_CACHE)
+        self.version = version
+        self.lock = threading.Lock()
+        self.commit_cada = commit_cada
+        self.sin_commit = 0
+
+    def buscar(self, url):
+        # (etag, ultima_modificacion, huella, extraido) o None; extraido es
+        # None si se obtuvo con otra versión de la extracción
+        with self.lock:
+            fila = self.conn.execute(
+                """
+                SELECT etag, ultima_modificacion, huella, extraido, version
+                FROM respuestas WHERE url = ?
+            """,
+                (url,),
+            ).fetchone()
+        if fila is None:
+            return None
+        etag, ultima_modificacion, huella_cuerpo, extraido, version = fila
+        extraido = json.loads(extraido) if version == self.version else None
+        return etag, ultima_modificacion, huella_cuerpo, extraido
+
+    def cabeceras_condicionales(self, entrada):
+        if entrada is None:
+            return {}
+        etag, ultima_modificacion = entrada[:2]
+        cabeceras = {}
+        if etag:
+            cabeceras["If-None-Match"] = etag
+        if ultima_modificacion:
+            cabeceras["If-Modified-Since"] = ultima_modificacion
+        return cabeceras
+
+    def guardar(self, url, response, huella_cuerpo, codificacion, extraido):
+        ahora = time.time()
+        self._escribir(
+            """
+            INSERT OR REPLACE INTO respuestas (
+                url, etag, ultima_modificacion, huella, cuerpo, codificacion,
+                extraido, version, obtenido_en, revalidado_en
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            (
+                url,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                huella_cuerpo,
+                zlib.compress(response.content),
+                codificacion,
+                json.dumps(extraido),
+                self.version,
+                ahora,
+                ahora,
+            ),
+        )
+
+    def revalidada(self, url, response, extraido):
+        # 304 o cuerpo idéntico: se actualizan validadores, fecha y lo
+        # extraído (que cambia si se volvió a parsear con otra versión)
+        self._escribir(
+            """
+            UPDATE respuestas SET
+                etag = COALESCE(?, etag),
+                ultima_modificacion = COALESCE(?, ultima_modificacion),
+                extraido = ?, version = ?, revalidado_en = ?
+            WHERE url = ?
+        """,
+            (
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                json.dumps(extraido),
+                self.version,
+                time.time(),
+                url,
+            ),
+        )
+
+    def cuerpo(self, url):
+        # (bytes, codificacion) guardados, para volver a parsear sin red
+        with self.lock:
+            fila = self.conn.execute(
+                "SELECT cuerpo, codificacion FROM respuestas WHERE url = ?", (url,)
+            ).fetchone()
+        return zlib.decompress(fila[0]), fila[1]
+
+    def _escribir(self, sql, parametros):
+        with self.lock:
+            self.conn.execute(sql, parametros)
+            self.sin_commit += 1
+            if self.sin_commit >= self.commit_cada:
+                self.conn.commit()
+                self.sin_commit = 0
+
+    def cerrar(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
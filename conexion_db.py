@@ -0,0 +1,305 @@
+import os
+import re
+import sqlite3
+from dotenv import load_dotenv
+
+# --- Cargar variables de entorno ---
+load_dotenv()
+
+RUTA_DB = os.getenv("LIBROS_DB", "libros.db")
+
+# --- Perfil de PRAGMAs aplicado a cada conexión ---
+# WAL permite leer (visualizar_libros.py) mientras el crawler escribe y,
+# junto con synchronous=NORMAL, evita un fsync por cada commit.
+PERFIL_SQLITE = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negativo = KiB
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# Sentencias preparadas que sqlite3 guarda por conexión (clave: texto SQL)
+CACHE_SENTENCIAS = int(os.getenv("SQLITE_CACHE_SENTENCIAS", "256"))
+
+
+def conectar_db(ruta=RUTA_DB, perfil=PERFIL_SQLITE, **kwargs):
+    kwargs.setdefault("cached_statements", CACHE_SENTENCIAS)
+    conn = sqlite3.connect(ruta, **kwargs)
+    for pragma, valor in perfil.items():
+        conn.execute(f"PRAGMA {pragma} = {valor}")
+    return conn
+
+
+def generacion_crawl(conn):
+    # Contador que base_de_datos.py incrementa al terminar cada crawl;
+    # 0 si la base todavía no tiene la tabla metadatos.
+    try:
+        fila = conn.execute(
+            "SELECT valor FROM metadatos WHERE clave = 'generacion_crawl'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return fila[0] if fila else 0
+
+
+# --- Crear tablas ---
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS autores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    nombre TEXT UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS generos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    nombre TEXT UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS libros (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    titulo TEXT NOT NULL,
+    precio TEXT NOT NULL,
+    stock TEXT NOT NULL,
+    url TEXT NOT NULL,
+    rating INTEGER NOT NULL,
+    genero_id INTEGER NOT NULL,
+    FOREIGN KEY (genero_id) REFERENCES generos(id)
+);
+
+CREATE TABLE IF NOT EXISTS autor_libro (
+    autor_id INTEGER NOT NULL,
+    libro_id INTEGER NOT NULL,
+    PRIMARY KEY (autor_id, libro_id),
+    FOREIGN KEY (autor_id) REFERENCES autores(id),
+    FOREIGN KEY (libro_id) REFERENCES libros(id)
+);
+
+CREATE TABLE IF NOT EXISTS cache_autores (
+    titulo TEXT PRIMARY KEY NOT NULL,
+    autores TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    obtenido_en REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY NOT NULL,
+    valor INTEGER NOT NULL
+);
+
+-- URLs del crawl en curso; se vacía cuando un crawl termina completo
+CREATE TABLE IF NOT EXISTS frontera (
+    url TEXT PRIMARY KEY NOT NULL,
+    tipo TEXT NOT NULL,                         -- categoria, listado o detalle
+    categoria TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',   -- ver base_de_datos.ESTADOS_TERMINALES
+    intentos INTEGER NOT NULL DEFAULT 0,
+    origen TEXT,                                -- detalle: página de listado
+    datos TEXT,                                 -- detalle: JSON del listado
+    actualizado_en REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_frontera_categoria ON frontera(categoria, tipo);
+"""
+
+
+# --- Conversión de texto scrapeado a columnas numéricas ---
+def precio_a_peniques(precio):
+    # "£45.17" -> 4517
+    numero = re.sub(r"[^\d.]", "", precio)
+    return round(float(numero) * 100) if numero else None
+
+
+def extraer_stock_disponible(stock):
+    # "In stock (19 available)" -> 19
+    coincidencia = re.search(r"\((\d+) available\)", stock)
+    return int(coincidencia.group(1)) if coincidencia else 0
+
+
+# --- Migraciones (se aplican según PRAGMA user_version) ---
+def migracion_url_unica(cursor):
+    # Conserva la fila más antigua de cada url antes de crear el índice único
+    cursor.executescript(
+        """
+    DELETE FROM autor_libro WHERE libro_id IN (
+        SELECT id FROM libros
+        WHERE id NOT IN (SELECT MIN(id) FROM libros GROUP BY url)
+    );
+    DELETE FROM libros WHERE id NOT IN (SELECT MIN(id) FROM libros GROUP BY url);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_libros_url ON libros(url);
+    """
+    )
+
+
+def migracion_precio_stock_numericos(cursor):
+    cursor.execute("ALTER TABLE libros ADD COLUMN precio_peniques INTEGER")
+    cursor.execute("ALTER TABLE libros ADD COLUMN stock_disponible INTEGER")
+    cursor.execute("SELECT id, precio, stock FROM libros")
+    cursor.executemany(
+        "UPDATE libros SET precio_peniques = ?, stock_disponible = ? WHERE id = ?",
+        [
+            (precio_a_peniques(precio), extraer_stock_disponible(stock), libro_id)
+            for libro_id, precio, stock in cursor.fetchall()
+        ],
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_precio ON libros(precio_peniques)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_libros_stock ON libros(stock_disponible)"
+    )
+
+
+def migracion_busqueda_fts(cursor):
+    # Índice de texto completo (trigram: sirve para buscar subcadenas) con
+    # título, autores y género; los triggers lo mantienen sincronizado.
+    cursor.executescript(
+        """
+    CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts
+    USING fts5(titulo, autores, genero, tokenize = 'trigram');
+
+    CREATE TRIGGER IF NOT EXISTS libros_fts_insertar AFTER INSERT ON libros BEGIN
+        INSERT INTO libros_fts (rowid, titulo, autores, genero)
+        VALUES (
+            new.id, new.titulo, '',
+            (SELECT nombre FROM generos WHERE id = new.genero_id)
+        );
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS libros_fts_actualizar
+    AFTER UPDATE OF titulo, genero_id ON libros BEGIN
+        UPDATE libros_fts
+        SET titulo = new.titulo,
+            genero = (SELECT nombre FROM generos WHERE id = new.genero_id)
+        WHERE rowid = new.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS libros_fts_borrar AFTER DELETE ON libros BEGIN
+        DELETE FROM libros_fts WHERE rowid = old.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS libros_fts_autor_insertar
+    AFTER INSERT ON autor_libro BEGIN
+        UPDATE libros_fts
+        SET autores = (
+            SELECT GROUP_CONCAT(autores.nombre, ', ')
+            FROM autor_libro JOIN autores ON autores.id = autor_libro.autor_id
+            WHERE autor_libro.libro_id = new.libro_id
+        )
+        WHERE rowid = new.libro_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS libros_fts_autor_borrar
+    AFTER DELETE ON autor_libro BEGIN
+        UPDATE libros_fts
+        SET autores = COALESCE((
+            SELECT GROUP_CONCAT(autores.nombre, ', ')
+            FROM autor_libro JOIN autores ON autores.id = autor_libro.autor_id
+            WHERE autor_libro.libro_id = old.libro_id
+        ), '')
+        WHERE rowid = old.libro_id;
+    END;
+
+    DELETE FROM libros_fts;
+    INSERT INTO libros_fts (rowid, titulo, autores, genero)
+    SELECT libros.id, libros.titulo,
+           COALESCE((
+               SELECT GROUP_CONCAT(autores.nombre, ', ')
+               FROM autor_libro JOIN autores ON autores.id = autor_libro.autor_id
+               WHERE autor_libro.libro_id = libros.id
+           ), ''),
+           generos.nombre
+    FROM libros LEFT JOIN generos ON generos.id = libros.genero_id;
+    """
+    )
+
+
+def migracion_indices_paginacion(cursor):
+    # El visor recorre libros en orden (titulo, id) y busca los autores de
+    # cada libro; la clave primaria de autor_libro empieza por autor_id.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_libros_titulo ON libros(titulo)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_autor_libro_libro ON autor_libro(libro_id)"
+    )
+
+
+def migracion_autores_texto(cursor):
+    # Lista de autores desnormalizada en libros para que el visor no tenga
+    # que unir autor_libro/autores ni agrupar en cada consulta. Los triggers
+    # la recalculan al cambiar autor_libro o el nombre de un autor, y el
+    # índice libros_fts pasa a copiarla de ahí.
+    cursor.executescript(
+        """
+    ALTER TABLE libros ADD COLUMN autores_texto TEXT;
+
+    UPDATE libros SET autores_texto = (
+        SELECT GROUP_CONCAT(autores.nombre, ', ')
+        FROM autor_libro JOIN autores ON autores.id = autor_libro.autor_id
+        WHERE autor_libro.libro_id = libros.id
+    );
+
+    DROP TRIGGER IF EXISTS libros_fts_autor_insertar;
+    DROP TRIGGER IF EXISTS libros_fts_autor_borrar;
+
+    CREATE TRIGGER IF NOT EXISTS libros_autores_insertar
+    AFTER INSERT ON autor_libro BEGIN
+        UPDATE libros SET autores_texto = (
+            SELECT GROUP_CONCAT(autores.nombre, ', ')
+            FROM autor_libro JOIN autores ON autores.id = autor_libro.autor_id
+            WHERE autor_libro.libro_id = new.libro_id
+        )
+        WHERE id = new.libro_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS libros_autores_borrar
+    AFTER DELETE ON autor_libro BEGIN
+        UPDATE libros SET autores_texto = (
+            SELECT GROUP_CONCAT(autores.nombre, ', ')
+            FROM autor_libro JOIN autores ON autores.id = autor_libro.autor_id
+            WHERE autor_libro.libro_id = old.libro_id
+        )
+        WHERE id = old.libro_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS libros_autores_renombrar
+    AFTER UPDATE OF nombre ON autores BEGIN
+        UPDATE libros SET autores_texto = (
+            SELECT GROUP_CONCAT(autores.nombre, ', ')
+            FROM autor_libro JOIN autores ON autores.id = autor_libro.autor_id
+            WHERE autor_libro.libro_id = libros.id
+        )
+        WHERE id IN (SELECT libro_id FROM autor_libro WHERE autor_id = new.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS libros_fts_autores
+    AFTER UPDATE OF autores_texto ON libros BEGIN
+        UPDATE libros_fts SET autores = COALESCE(new.autores_texto, '')
+        WHERE rowid = new.id;
+    END;
+    """
+    )
+
+
+MIGRACIONES = [
+    migracion_url_unica,
+    migracion_precio_stock_numericos,
+    migracion_busqueda_fts,
+    migracion_indices_paginacion,
+    migracion_autores_texto,
+]
+
+
+def aplicar_migraciones(conn):
+    cursor = conn.cursor()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for numero, migracion in enumerate(MIGRACIONES[version:], start=version + 1):
+        migracion(cursor)
+        cursor.execute(f"PRAGMA user_version = {numero}")
+        conn.commit()
+        print(f"🛠️ Migración {numero} aplicada: {migracion.__name__}")
+
+
+def preparar_db(conn):
+    # Crea las tablas que falten y aplica las migraciones pendientes; lo usan
+    # el crawler, el visor y la API antes de leer columnas nuevas.
+    conn.executescript(ESQUEMA)
+    aplicar_migraciones(conn)
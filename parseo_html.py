@@ -0,0 +1,126 @@
+import os
+from bs4 import BeautifulSoup, SoupStrainer
+
+# --- lxml es opcional: si está instalado se usa directo con XPath ---
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# "auto": lxml si está, si no BeautifulSoup restringido a los nodos útiles.
+# "bs4-completo" arma el árbol entero como antes (solo para comparar).
+PARSER = os.getenv("SCRAPER_PARSER", "auto")
+
+# Subirla al cambiar qué devuelven extraer_listado/extraer_detalle: la cache
+# HTTP vuelve a parsear los cuerpos guardados en vez de reutilizar lo viejo.
+VERSION_EXTRACCION = 1
+
+# Solo se construyen los subárboles que se leen después. Al filtrar durante
+# el parseo, class se compara como texto completo, no por cada clase.
+SOLO_ARTICULOS = SoupStrainer("article", class_="product_pod")
+SOLO_DETALLE = SoupStrainer(
+    ["ul", "table"], class_=["breadcrumb", "table table-striped"]
+)
+
+
+def clase(nombre):
+    # Equivalente XPath del selector CSS .nombre
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {nombre} ')"
+
+
+# --- Backend lxml ---
+def listado_lxml(html):
+    arbol = lxml.html.fromstring(html)
+    libros = []
+    for articulo in arbol.xpath(f"//article[{clase('product_pod')}]"):
+        estrellas = articulo.xpath(f".//p[{clase('star-rating')}]/@class")[0]
+        enlace = articulo.xpath(".//h3/a")[0]
+        precio = articulo.xpath(f".//p[{clase('price_color')}]")[0]
+        libros.append(
+            (
+                enlace.get("title"),
+                precio.text_content(),
+                estrellas.split()[1],
+                enlace.get("href"),
+            )
+        )
+    return libros
+
+
+def detalle_lxml(html):
+    arbol = lxml.html.fromstring(html)
+    breadcrumb = arbol.xpath(f"//ul[{clase('breadcrumb')}]//li//a")
+    genero = breadcrumb[2].text_content().strip() if len(breadcrumb) >= 3 else None
+    filas = arbol.xpath("//table[@class='table table-striped']//tr")
+    stock = filas[5].xpath(".//td")[0].text_content().strip() if filas else None
+    return genero, stock
+
+
+# --- Backend BeautifulSoup ---
+def listado_bs4(html, parse_only=SOLO_ARTICULOS, parser="html.parser"):
+    soup = BeautifulSoup(html, parser, parse_only=parse_only)
+    libros = []
+    for libro in soup.find_all("article", class_="product_pod"):
+        libros.append(
+            (
+                libro.h3.a["title"],
+                libro.find("p", class_="price_color").text,
+                libro.find("p", class_="star-rating")["class"][1],
+                libro.h3.a["href"],
+            )
+        )
+    return libros
+
+
+def detalle_bs4(html, parse_only=SOLO_DETALLE, parser="html.parser"):
+    soup = BeautifulSoup(html, parser, parse_only=parse_only)
+    breadcrumb = soup.select("ul.breadcrumb li a")
+    genero = breadcrumb[2].text.strip() if len(breadcrumb) >= 3 else None
+    tabla = soup.find("table", class_="table table-striped")
+    stock = tabla.find_all("tr")[5].find("td").text.strip() if tabla else None
+    return genero, stock
+
+
+def listado_bs4_completo(html):
+    return listado_bs4(html, parse_only=None)
+
+
+def detalle_bs4_completo(html):
+    return detalle_bs4(html, parse_only=None)
+
+
+BACKENDS = {
+    "lxml": (listado_lxml, detalle_lxml),
+    "bs4": (listado_bs4, detalle_bs4),
+    "bs4-completo": (listado_bs4_completo, detalle_bs4_completo),
+}
+
+
+def elegir_backend(nombre=PARSER):
+    if nombre == "auto":
+        nombre = "lxml" if lxml else "bs4"
+    if nombre == "lxml" and lxml is None:
+        raise ImportError("SCRAPER_PARSER=lxml requiere 'pip install lxml'")
+    if nombre not in BACKENDS:
+        raise ValueError(f"Parser desconocido: {nombre}")
+    return nombre
+
+
+BACKEND = elegir_backend()
+
+
+def extraer_listado(html, backend=BACKEND):
+    """Lista de (titulo, precio, rating_texto, url_relativa) de una página."""
+    return BACKENDS[backend][0](html)
+
+
+def extraer_detalle(html, backend=BACKEND):
+    """(genero, stock) de la página de un libro; None donde falte el dato."""
+    return BACKENDS[backend][1](html)
+
+
+def parsear(tipo, contenido, codificacion):
+    """Punto de entrada para procesos: recibe los bytes crudos de la respuesta
+    y los decodifica igual que response.text antes de extraer."""
+    html = str(contenido, codificacion or "utf-8", errors="replace")
+    return extraer_listado(html) if tipo == "listado" else extraer_detalle(html)
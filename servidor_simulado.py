@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# --- Catálogo sintético (determinista para un mismo tamaño) ---
+SIMULADOR_LIBROS = int(os.getenv("SIMULADOR_LIBROS", "1000"))
+SIMULADOR_CATEGORIAS = int(os.getenv("SIMULADOR_CATEGORIAS", "50"))
+LIBROS_POR_PAGINA = 20  # igual que books.toscrape.com
+
+# --- Fallas inyectadas ---
+SIMULADOR_LATENCIA = float(os.getenv("SIMULADOR_LATENCIA", "0"))  # segundos
+SIMULADOR_JITTER = float(os.getenv("SIMULADOR_JITTER", "0"))  # +/- segundos
+SIMULADOR_TASA_ERROR = float(os.getenv("SIMULADOR_TASA_ERROR", "0"))  # 0..1 -> 503
+SIMULADOR_SIN_AUTOR = float(os.getenv("SIMULADOR_SIN_AUTOR", "0.1"))  # 0..1
+SIMULADOR_SEMILLA = int(os.getenv("SIMULADOR_SEMILLA", "42"))
+# ETag/Last-Modified y 304 como el sitio real (0 = sin validadores)
+SIMULADOR_VALIDADORES = os.getenv("SIMULADOR_VALIDADORES", "1") == "1"
+ULTIMA_MODIFICACION = "Thu, 01 Jan 2026 00:00:00 GMT"
+
+SIMULADOR_HOST = os.getenv("SIMULADOR_HOST", "127.0.0.1")
+SIMULADOR_PUERTO = int(os.getenv("SIMULADOR_PUERTO", "8000"))
+
+# fmt: off
+NOMBRES_CATEGORIAS = [
+    "Travel", "Mystery", "Historical Fiction", "Sequential Art", "Classics",
+    "Philosophy", "Romance", "Womens Fiction", "Fiction", "Childrens",
+    "Religion", "Nonfiction", "Music", "Science Fiction", "Sports and Games",
+    "Fantasy", "New Adult", "Young Adult", "Science", "Poetry", "Paranormal",
+    "Art", "Psychology", "Autobiography", "Parenting", "Adult Fiction",
+    "Humor", "Horror", "History", "Food and Drink", "Christian Fiction",
+    "Business", "Biography", "Thriller", "Contemporary", "Spirituality",
+    "Academic", "Self Help", "Historical", "Christian", "Suspense",
+    "Short Stories", "Novels", "Health", "Politics", "Cultural", "Erotica",
+    "Crime",
+]
+PALABRAS = [
+    "Silent", "River", "Shadow", "Garden", "Empire", "Winter", "Secret",
+    "Light", "Journey", "Stone", "Ocean", "Memory", "Fire", "City", "Night",
+    "Harbor", "Crown", "Letter", "Mountain", "Storm",
+]
+APELLIDOS = [
+    "Smith", "Garcia", "Okafor", "Tanaka", "Müller", "Rossi", "Silva",
+    "Novak", "Kowalski", "Haddad", "Nguyen", "Ortiz",
+]
+# fmt: on
+ESTRELLAS = ["One", "Two", "Three", "Four", "Five"]
+
+# Relleno con el tamaño aproximado de la cabecera/navegación del sitio real,
+# para que el costo de parseo se parezca al de producción.
+RELLENO = (
+    '<header class="header container-fluid"><div class="page_inner">'
+    + "".join(
+        f'<link rel="stylesheet" href="/static/css/estilo-{i}.css">'
+        f'<script src="/static/js/modulo-{i}.js"></script>'
+        for i in range(20)
+    )
+    + "</div></header>"
+)
+
+
+def nombre_categoria(indice):
+    base = NOMBRES_CATEGORIAS[indice % len(NOMBRES_CATEGORIAS)]
+    vuelta = indice // len(NOMBRES_CATEGORIAS)
+    return f"{base} {vuelta + 1}" if vuelta else base
+
+
+def slug(texto):
+    return re.sub(r"[^a-z0-9]+", "-", texto.lower()).strip("-")
+
+
+def slug_categoria(indice):
+    return f"{slug(nombre_categoria(indice))}_{indice + 2}"
+
+
+def titulo_libro(numero):
+    a = PALABRAS[numero % len(PALABRAS)]
+    b = PALABRAS[(numero // len(PALABRAS)) % len(PALABRAS)]
+    return f"The {a} {b} #{numero}"
+
+
+def slug_libro(numero):
+    return f"{slug(titulo_libro(numero))}_{numero}"
+
+
+def libro(numero):
+    return {
+        "titulo": titulo_libro(numero),
+        "slug": slug_libro(numero),
+        "precio": f"£{10 + (numero * 37) % 5000 / 100:.2f}",
+        "rating": ESTRELLAS[numero % 5],
+        "stock": f"In stock ({1 + (numero * 7) % 22} available)",
+        "categoria": numero % SIMULADOR_CATEGORIAS,
+    }
+
+
+def libros_de_categoria(categoria):
+    return range(categoria, SIMULADOR_LIBROS, SIMULADOR_CATEGORIAS)
+
+
+def autores_de(titulo):
+    # Algunos títulos sin resultado y otros con coautores, como en la API real
+    n = sum(map(ord, titulo))
+    if (n % 1000) / 1000 < SIMULADOR_SIN_AUTOR:
+        return []
+    autores = [f"{chr(65 + n % 26)}. {APELLIDOS[n % len(APELLIDOS)]}"]
+    if n % 4 == 0:
+        m = n // 7
+        autores.append(f"{chr(65 + m % 26)}. {APELLIDOS[m % len(APELLIDOS)]}")
+    return autores
+
+
+# --- Páginas ---
+def pagina_inicio():
+    enlaces = "".join(
+        f'<li>\n<a href="catalogue/category/books/{slug_categoria(i)}/index.html">'
+        f"\n    {nombre_categoria(i)}\n</a>\n</li>"
+        for i in range(SIMULADOR_CATEGORIAS)
+    )
+    return (
+        f"<html><body>{RELLENO}<div class=\"side_categories\"><ul class=\"nav\">"
+        f'<li><a href="catalogue/category/books_1/index.html">Books</a>'
+        f"<ul>{enlaces}</ul></li></ul></div></body></html>"
+    )
+
+
+def pagina_listado(categoria, pagina):
+    numeros = libros_de_categoria(categoria)
+    inicio = (pagina - 1) * LIBROS_POR_PAGINA
+    numeros = numeros[inicio : inicio + LIBROS_POR_PAGINA]
+    if not numeros:
+        return None
+    articulos = "".join(
+        '<li class="col-xs-6"><article class="product_pod">'
+        f'<div class="image_container"><a href="../../../{d["slug"]}/index.html">'
+        f'<img src="../../../../media/cache/{d["slug"]}.jpg" class="thumbnail">'
+        f'</a></div><p class="star-rating {d["rating"]}"></p>'
+        f'<h3><a href="../../../{d["slug"]}/index.html" title="{d["titulo"]}">'
+        f'{d["titulo"][:30]}...</a></h3><div class="product_price">'
+        f'<p class="price_color">{d["precio"]}</p>'
+        '<p class="instock availability">In stock</p></div></article></li>'
+        for d in map(libro, numeros)
+    )
+    return (
+        f"<html><body>{RELLENO}<h1>{nombre_categoria(categoria)}</h1>"
+        f'<ol class="row">{articulos}</ol></body></html>'
+    )
+
+
+def pagina_detalle(numero):
+    d = libro(numero)
+    filas = [
+        ("UPC", f"{numero:016x}"),
+        ("Product Type", "Books"),
+        ("Price (excl. tax)", d["precio"]),
+        ("Price (incl. tax)", d["precio"]),
+        ("Tax", "£0.00"),
+        ("Availability", d["stock"]),
+        ("Number of reviews", "0"),
+    ]
+    tabla = "".join(f"<tr><th>{th}</th><td>{td}</td></tr>" for th, td in filas)
+    categoria = d["categoria"]
+    return (
+        f'<html><body>{RELLENO}<ul class="breadcrumb">'
+        '<li><a href="../../index.html">Home</a></li>'
+        '<li><a href="../category/books_1/index.html">Books</a></li>'
+        f'<li><a href="../category/books/{slug_categoria(categoria)}/index.html">'
+        f"{nombre_categoria(categoria)}</a></li>"
+        f'<li class="active">{d["titulo"]}</li></ul>'
+        f'<div class="product_main"><h1>{d["titulo"]}</h1></div>'
+        f'<table class="table table-striped">{tabla}</table></body></html>'
+    )
+
+
+def respuesta_volumenes(consulta):
+    titulo = consulta.removeprefix("intitle:")
+    autores = autores_de(titulo)
+    if not autores:
+        return {"kind": "books#volumes", "totalItems": 0}
+    volumen = {"title": titulo, "authors": autores}
+    return {
+        "kind": "books#volumes",
+        "totalItems": 1,
+        "items": [{"volumeInfo": volumen}],
+    }
+
+
+# --- Servidor ---
+estadisticas = {"peticiones": 0, "errores": 0, "no_modificadas": 0}
+lock_estadisticas = threading.Lock()
+azar = random.Random(SIMULADOR_SEMILLA)
+
+RUTA_LISTADO = re.compile(
+    r"^/catalogue/category/books/[^/]+_(\d+)/(?:index|page-(\d+))\.html$"
+)
+RUTA_DETALLE = re.compile(r"^/catalogue/[^/]+_(\d+)/index\.html$")
+
+
+class ManejadorSimulado(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como el sitio real
+    # Cabeceras y cuerpo salen en dos send(); sin TCP_NODELAY cada respuesta
+    # esperaría el ACK retrasado (~40 ms) y falsearía las mediciones.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def enviar(self, estado, cuerpo, tipo="text/html"):
+        # Como el sitio real: UTF-8 sin charset declarado ("£" llega como "Â£")
+        datos = cuerpo.encode("utf-8")
+        cabeceras = {"Content-Type": tipo}
+        if SIMULADOR_VALIDADORES and estado == 200 and tipo == "text/html":
+            etag = '"' + hashlib.md5(datos).hexdigest() + '"'
+            cabeceras["ETag"] = etag
+            cabeceras["Last-Modified"] = ULTIMA_MODIFICACION
+            if etag == self.headers.get("If-None-Match"):
+                with lock_estadisticas:
+                    estadisticas["no_modificadas"] += 1
+                estado, datos = 304, b""
+        self.send_response(estado)
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        with lock_estadisticas:
+            estadisticas["peticiones"] += 1
+            fallar = azar.random() < SIMULADOR_TASA_ERROR
+            espera = SIMULADOR_LATENCIA + azar.uniform(
+                -SIMULADOR_JITTER, SIMULADOR_JITTER
+            )
+        partes = urlsplit(self.path)
+        if partes.path == "/__estadisticas":
+            with lock_estadisticas:
+                cuerpo = json.dumps(estadisticas)
+            return self.enviar(200, cuerpo, "application/json")
+
+        time.sleep(max(espera, 0))
+        if fallar:
+            with lock_estadisticas:
+                estadisticas["errores"] += 1
+            return self.enviar(503, "Servicio no disponible (simulado)")
+
+        if partes.path == "/books/v1/volumes":
+            consulta = parse_qs(partes.query).get("q", [""])[0]
+            cuerpo = json.dumps(respuesta_volumenes(consulta))
+            return self.enviar(200, cuerpo, "application/json; charset=utf-8")
+        if partes.path in {"/", "/index.html"}:
+            return self.enviar(200, pagina_inicio())
+
+        listado = RUTA_LISTADO.match(partes.path)
+        if listado:
+            categoria = int(listado.group(1)) - 2
+            pagina = int(listado.group(2) or 1)
+            cuerpo = None
+            if 0 <= categoria < SIMULADOR_CATEGORIAS:
+                cuerpo = pagina_listado(categoria, pagina)
+            if cuerpo is not None:
+                return self.enviar(200, cuerpo)
+        detalle = RUTA_DETALLE.match(partes.path)
+        if detalle and int(detalle.group(1)) < SIMULADOR_LIBROS:
+            return self.enviar(200, pagina_detalle(int(detalle.group(1))))
+        self.enviar(404, "<h1>404 Not Found</h1>")
+
+
+def main():
+    servidor = ThreadingHTTPServer(
+        (SIMULADOR_HOST, SIMULADOR_PUERTO), ManejadorSimulado
+    )
+    servidor.daemon_threads = True
+    base = f"http://{SIMULADOR_HOST}:{servidor.server_port}/"
+    print(
+        f"🧪 Sitio simulado con {SIMULADOR_LIBROS} libros en "
+        f"{SIMULADOR_CATEGORIAS} categorías: {base}"
+    )
+    print(f"   SCRAPER_BASE_URL={base}")
+    print(f"   GOOGLE_BOOKS_URL={base}books/v1/volumes")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Servidor simulado detenido.")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
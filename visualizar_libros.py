@@ -1,24 +1,232 @@
-import sqlite3
 import csv
+import gzip
+import math
 import os
+from collections import OrderedDict, defaultdict
+from conexion_db import conectar_db, generacion_crawl, preparar_db
 
+# --- Dependencias opcionales para la exportación columnar ---
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
 
-def exportar_a_csv(libros):
-    nombre_archivo = "libros_filtrados.csv"
-    with open(nombre_archivo, mode="w", newline="", encoding="utf-8") as f:
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# --- Paginación ---
+TAMANO_PAGINA = int(os.getenv("VISOR_TAMANO_PAGINA", "20"))
+TAMANO_BLOQUE = int(os.getenv("VISOR_TAMANO_BLOQUE", "500"))  # filas por fetchmany
+
+# --- Cache de resultados ---
+CACHE_ENTRADAS = int(os.getenv("VISOR_CACHE_ENTRADAS", "128"))
+CACHE_FILAS = int(os.getenv("VISOR_CACHE_FILAS", "20000"))
+# "escritura": se vacía con cualquier commit de otra conexión (data_version).
+# "crawl": se conserva hasta que termina el crawl (generacion_crawl).
+CACHE_INVALIDACION = os.getenv("VISOR_CACHE_INVALIDACION", "escritura")
+
+# --- Exportación ---
+RUTA_EXPORTACION = os.getenv("VISOR_RUTA_EXPORTACION", "libros_filtrados.csv")
+
+
+def exportar_a_csv(
+    cursor,
+    nombre_archivo=RUTA_EXPORTACION,
+    comprimir=False,
+    tamano_bloque=TAMANO_BLOQUE,
+):
+    # Escribe directo desde el cursor, de a bloques, sin juntar los resultados
+    if comprimir and not nombre_archivo.endswith(".gz"):
+        nombre_archivo += ".gz"
+    abrir = gzip.open if comprimir else open
+    total = 0
+    with abrir(nombre_archivo, mode="wt", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(
             ["Título", "Precio", "Stock", "Rating", "URL", "Género", "Autor(es)"]
         )
-        for libro in libros:
-            writer.writerow(libro)
+        while True:
+            libros = cursor.fetchmany(tamano_bloque)
+            if not libros:
+                break
+            writer.writerows(libro[:7] for libro in libros)
+            total += len(libros)
     print(
-        f"✅ Resultados exportados correctamente a '{os.path.abspath(nombre_archivo)}'"
+        f"✅ {total} resultados exportados correctamente a "
+        f"'{os.path.abspath(nombre_archivo)}'"
+    )
+    return total
+
+
+def formatos_columnares():
+    formatos = []
+    if pa is not None:
+        formatos += ["parquet", "arrow"]
+    if np is not None:
+        formatos.append("npz")
+    return formatos
+
+
+def bloques_columnares(cursor, tamano_bloque):
+    # Convierte cada bloque de filas (COLUMNAS_ANALISIS) en columnas tipadas
+    while True:
+        libros = cursor.fetchmany(tamano_bloque)
+        if not libros:
+            return
+        titulos, peniques, stock, rating, urls, generos, autores = zip(
+            *(libro[:7] for libro in libros)
+        )
+        yield {
+            "titulo": titulos,
+            "precio": [None if p is None else p / 100 for p in peniques],
+            "stock_disponible": stock,
+            "rating": rating,
+            "url": urls,
+            "genero": generos,
+            "autores": [a.split(SEPARADOR_AUTORES) if a else [] for a in autores],
+        }
+
+
+def escribir_arrow(bloques, generos, nombre_archivo, formato):
+    # El mismo diccionario de géneros en todos los lotes (el formato de
+    # archivo Arrow IPC no admite reemplazarlo entre lotes)
+    esquema = pa.schema(
+        [
+            ("titulo", pa.string()),
+            ("precio", pa.float64()),
+            ("stock_disponible", pa.int32()),
+            ("rating", pa.int8()),
+            ("url", pa.string()),
+            ("genero", pa.dictionary(pa.int16(), pa.string())),
+            ("autores", pa.list_(pa.string())),
+        ]
     )
+    diccionario = pa.array(generos, pa.string())
+    indice_genero = {nombre: i for i, nombre in enumerate(generos)}
+    abrir = pq.ParquetWriter if formato == "parquet" else pa.ipc.new_file
+    total = 0
+    with abrir(nombre_archivo, esquema) as writer:
+        for bloque in bloques:
+            codigos = pa.array(
+                [indice_genero.get(g) for g in bloque["genero"]], pa.int16()
+            )
+            lote = pa.record_batch(
+                [
+                    pa.array(bloque["titulo"], pa.string()),
+                    pa.array(bloque["precio"], pa.float64()),
+                    pa.array(bloque["stock_disponible"], pa.int32()),
+                    pa.array(bloque["rating"], pa.int8()),
+                    pa.array(bloque["url"], pa.string()),
+                    pa.DictionaryArray.from_arrays(codigos, diccionario),
+                    pa.array(bloque["autores"], pa.list_(pa.string())),
+                ],
+                schema=esquema,
+            )
+            writer.write_batch(lote)
+            total += lote.num_rows
+    return total
 
 
-def conectar_db():
-    return sqlite3.connect("libros.db")
+def escribir_npz(bloques, generos, nombre_archivo):
+    # Sin pyarrow: arrays NumPy sin objetos Python. genero guarda códigos
+    # sobre el array "generos" (-1 = desconocido) y los autores quedan
+    # aplanados en "autores", con "autores_inicio" como offsets por libro.
+    indice_genero = {nombre: i for i, nombre in enumerate(generos)}
+    partes = defaultdict(list)
+    for bloque in bloques:
+        partes["titulo"].append(np.array(bloque["titulo"], dtype=str))
+        partes["precio"].append(np.array(bloque["precio"], dtype=np.float64))
+        partes["stock_disponible"].append(
+            np.array(bloque["stock_disponible"], dtype=np.int32)
+        )
+        partes["rating"].append(np.array(bloque["rating"], dtype=np.int8))
+        partes["url"].append(np.array(bloque["url"], dtype=str))
+        partes["genero"].append(
+            np.array([indice_genero.get(g, -1) for g in bloque["genero"]], np.int16)
+        )
+        partes["autores"].append(
+            np.array([a for lista in bloque["autores"] for a in lista], dtype=str)
+        )
+        partes["autores_cantidad"].append(
+            np.array([len(lista) for lista in bloque["autores"]], dtype=np.int64)
+        )
+
+    tipos = {
+        "titulo": str,
+        "precio": np.float64,
+        "stock_disponible": np.int32,
+        "rating": np.int8,
+        "url": str,
+        "genero": np.int16,
+        "autores": str,
+        "autores_cantidad": np.int64,
+    }
+    columnas = {
+        nombre: np.concatenate(partes[nombre]) if partes[nombre] else np.array([], tipo)
+        for nombre, tipo in tipos.items()
+    }
+    cantidades = columnas.pop("autores_cantidad")
+    columnas["autores_inicio"] = np.concatenate(([0], np.cumsum(cantidades)))
+    np.savez(nombre_archivo, generos=np.array(generos, dtype=str), **columnas)
+    return len(columnas["titulo"])
+
+
+def exportar_columnar(
+    cursor, generos, nombre_archivo, formato, tamano_bloque=TAMANO_BLOQUE
+):
+    # cursor: consulta armada con COLUMNAS_ANALISIS
+    bloques = bloques_columnares(cursor, tamano_bloque)
+    if formato == "npz":
+        total = escribir_npz(bloques, generos, nombre_archivo)
+    else:
+        total = escribir_arrow(bloques, generos, nombre_archivo, formato)
+    print(
+        f"✅ {total} resultados exportados en formato {formato} a "
+        f"'{os.path.abspath(nombre_archivo)}'"
+    )
+    return total
+
+
+def pedir_exportacion_columnar(cursor, consulta):
+    formatos = formatos_columnares()
+    if not formatos:
+        print("❌ Instale pyarrow (Parquet/Arrow) o numpy (.npz) para este formato.")
+        return
+    formato = (
+        input(f"📊 Formato ({'/'.join(formatos)}, Enter = {formatos[0]}): ")
+        .strip()
+        .lower()
+        or formatos[0]
+    )
+    if formato not in formatos:
+        print("❌ Formato no disponible.")
+        return
+    sugerido = f"libros_filtrados.{formato}"
+    nombre_archivo = (
+        input(f"💾 Archivo de salida (Enter = {sugerido}): ").strip() or sugerido
+    )
+    generos = [fila[0] for fila in cursor.execute("SELECT nombre FROM generos")]
+    cursor.execute(*consulta.sql(columnas=COLUMNAS_ANALISIS))
+    try:
+        exportar_columnar(cursor, generos, nombre_archivo, formato)
+    except OSError as e:
+        print(f"❌ No se pudo exportar: {e}")
+
+
+def pedir_exportacion(cursor, consulta):
+    nombre_archivo = (
+        input(f"💾 Archivo de salida (Enter = {RUTA_EXPORTACION}): ").strip()
+        or RUTA_EXPORTACION
+    )
+    comprimir = input("🗜️ ¿Comprimir con gzip? (s/n): ").strip().lower() == "s"
+    cursor.execute(*consulta.sql())
+    try:
+        exportar_a_csv(cursor, nombre_archivo, comprimir)
+    except OSError as e:
+        print(f"❌ No se pudo exportar: {e}")
 
 
 def mostrar_menu():
@@ -29,90 +237,457 @@ def mostrar_menu():
     print("4. Filtrar por autor")
     print("5. Filtrar por disponibilidad")
     print("6. Ver todos los libros")
+    print("7. Buscar por título o autor")
+    print("8. Combinar filtros")
     print("0. Salir")
 
 
-def construir_query(opcion):
-    query_base = """
-    SELECT libros.titulo, libros.precio, libros.stock, libros.rating,
-           libros.url, generos.nombre AS genero, GROUP_CONCAT(autores.nombre, ', ') AS autores
-    FROM libros
-    JOIN generos ON libros.genero_id = generos.id
-    JOIN autor_libro ON libros.id = autor_libro.libro_id
-    JOIN autores ON autores.id = autor_libro.autor_id
+# Columnas para mostrar y exportar a CSV. Los autores salen de la columna
+# desnormalizada libros.autores_texto (mantenida por triggers).
+COLUMNAS_LISTADO = """
+    libros.titulo, libros.precio, libros.stock, libros.rating,
+    libros.url, generos.nombre AS genero, libros.autores_texto AS autores
+"""
+
+# Columnas numéricas para la exportación columnar. Los nombres de autor
+# nunca llevan coma (el crawler los separa por comas), así que ", " es un
+# separador sin ambigüedad.
+SEPARADOR_AUTORES = ", "
+COLUMNAS_ANALISIS = """
+    libros.titulo, libros.precio_peniques, libros.stock_disponible,
+    libros.rating, libros.url, generos.nombre AS genero,
+    libros.autores_texto AS autores
+"""
+
+
+def expresion_fts(texto, columnas):
+    # Frase entre comillas: con el tokenizer trigram equivale a buscar la
+    # subcadena, como LIKE '%texto%', pero usando el índice libros_fts.
+    frase = '"' + texto.replace('"', '""') + '"'
+    return f"{{{' '.join(columnas)}}} : {frase}"
+
+
+def condicion_texto(texto, columna_fts, condicion_like):
+    # El índice trigram necesita al menos 3 caracteres
+    if len(texto) >= 3:
+        return (
+            "libros.id IN (SELECT rowid FROM libros_fts WHERE libros_fts MATCH ?)",
+            expresion_fts(texto, [columna_fts]),
+        )
+    return condicion_like, f"%{texto}%"
+
+
+CONDICION_AUTOR_LIKE = """EXISTS (
+        SELECT 1 FROM autor_libro
+        JOIN autores ON autores.id = autor_libro.autor_id
+        WHERE autor_libro.libro_id = libros.id AND autores.nombre LIKE ?
+    )"""
+
+JOIN_BUSQUEDA = """
+    JOIN (
+        SELECT rowid, rank FROM libros_fts WHERE libros_fts MATCH ?
+    ) AS busqueda ON busqueda.rowid = libros.id
+"""
+
+# Criterios de orden: columnas de la clave de paginación (la última es id)
+ORDENES = {
+    "titulo": ["libros.titulo", "libros.id"],
+    "precio": ["libros.precio_peniques", "libros.id"],
+    "rating": ["libros.rating", "libros.id"],
+    "stock": ["libros.stock_disponible", "libros.id"],
+    "relevancia": ["busqueda.rank", "libros.id"],
+}
+
+FILTROS = {
+    "rating",
+    "rating_min",
+    "precio_min",
+    "precio_max",
+    "genero",
+    "autor",
+    "disponible",
+    "texto",
+}
+
+
+class ConsultaLibros:
+    """Combina cualquier subconjunto de FILTROS con un orden y un límite.
+
+    El SQL generado solo depende de qué filtros están activos (nunca de sus
+    valores, que van como parámetros) y las condiciones siempre salen en el
+    mismo orden, así las consultas repetidas reutilizan la sentencia ya
+    preparada en la cache de sqlite3.
+
+        ConsultaLibros(rating_min=4, disponible=True).ordenar("precio").limitar(10)
     """
-    condiciones = []
-    parametros = []
 
-    if opcion == "1":
-        while True:
-            rating = input(" Ingrese rating (1-5): ").strip()
-            if rating.isdigit() and 1 <= int(rating) <= 5:
-                break
-            print("❌ Rating inválido. Debe ser un número del 1 al 5.")
-        condiciones.append("libros.rating = ?")
-        parametros.append(rating)
+    def __init__(self, **filtros):
+        self.filtros = {}
+        self.orden = None  # None: relevancia si hay texto, si no título
+        self.descendente = False
+        self.limite = None
+        self.filtrar(**filtros)
 
-    elif opcion == "2":
-        while True:
-            precio_max = input(" Ingrese precio máximo (sin símbolo): ").strip()
-            try:
-                float(precio_max)
-                break
-            except ValueError:
-                print("❌ Ingrese un número válido.")
-        condiciones.append("CAST(SUBSTR(libros.precio, 2) AS REAL) <= ?")
-        parametros.append(precio_max)
-
-    elif opcion == "3":
-        genero = input("📚 Ingrese nombre del género: ").strip()
-        condiciones.append("generos.nombre LIKE ?")
-        parametros.append(f"%{genero}%")
-
-    elif opcion == "4":
-        autor = input("👨‍💼 Ingrese nombre del autor: ").strip()
-        condiciones.append("autores.nombre LIKE ?")
-        parametros.append(f"%{autor}%")
-
-    elif opcion == "5":
-        condiciones.append("libros.stock NOT LIKE '%(0 available)%'")
-
-    where_clause = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
-    query = f"""
-    {query_base}
+    def filtrar(self, **filtros):
+        for nombre, valor in filtros.items():
+            if nombre not in FILTROS:
+                raise ValueError(f"Filtro desconocido: {nombre}")
+            if nombre == "texto" and valor is not None and len(valor) < 3:
+                raise ValueError("La búsqueda necesita al menos 3 caracteres")
+            if valor is None or valor is False or valor == "":
+                self.filtros.pop(nombre, None)
+            else:
+                self.filtros[nombre] = valor
+        return self
+
+    def ordenar(self, campo, descendente=False):
+        if campo not in ORDENES:
+            raise ValueError(f"Orden desconocido: {campo}")
+        self.orden = campo
+        self.descendente = descendente
+        return self
+
+    def limitar(self, limite):
+        self.limite = limite
+        return self
+
+    def columnas_orden(self):
+        orden = self.orden or ("relevancia" if "texto" in self.filtros else "titulo")
+        if orden == "relevancia" and "texto" not in self.filtros:
+            raise ValueError("El orden por relevancia requiere el filtro 'texto'")
+        return ORDENES[orden]
+
+    def condiciones(self):
+        # Devuelve (join, condiciones, parámetros) en orden canónico
+        filtros = self.filtros
+        join = ""
+        condiciones = []
+        parametros = []
+
+        if "texto" in filtros:
+            join = JOIN_BUSQUEDA
+            parametros.append(expresion_fts(filtros["texto"], ["titulo", "autores"]))
+        if "rating" in filtros:
+            condiciones.append("libros.rating = ?")
+            parametros.append(int(filtros["rating"]))
+        if "rating_min" in filtros:
+            condiciones.append("libros.rating >= ?")
+            parametros.append(int(filtros["rating_min"]))
+        if "precio_min" in filtros:
+            condiciones.append("libros.precio_peniques >= ?")
+            parametros.append(round(float(filtros["precio_min"]) * 100))
+        if "precio_max" in filtros:
+            condiciones.append("libros.precio_peniques <= ?")
+            parametros.append(round(float(filtros["precio_max"]) * 100))
+        if "genero" in filtros:
+            condicion, parametro = condicion_texto(
+                filtros["genero"], "genero", "generos.nombre LIKE ?"
+            )
+            condiciones.append(condicion)
+            parametros.append(parametro)
+        if "autor" in filtros:
+            condicion, parametro = condicion_texto(
+                filtros["autor"], "autores", CONDICION_AUTOR_LIKE
+            )
+            condiciones.append(condicion)
+            parametros.append(parametro)
+        if "disponible" in filtros:
+            condiciones.append("libros.stock_disponible > 0")
+
+        return join, condiciones, parametros
+
+    def sql(self, despues_de=None, limite=None, columnas=COLUMNAS_LISTADO):
+        # Paginación por clave (keyset): las columnas de orden se agregan al
+        # final de cada fila y la página siguiente empieza después de la
+        # última clave. limite=None usa el límite de la consulta.
+        join, condiciones, parametros = self.condiciones()
+        orden = ", ".join(self.columnas_orden())
+        direccion = "DESC" if self.descendente else "ASC"
+        if despues_de is not None:
+            marcadores = ", ".join("?" * len(despues_de))
+            comparacion = "<" if self.descendente else ">"
+            condiciones.append(f"({orden}) {comparacion} ({marcadores})")
+            parametros.extend(despues_de)
+
+        where_clause = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        orden_sql = ", ".join(f"{c} {direccion}" for c in self.columnas_orden())
+        query = f"""
+    SELECT {columnas}, {orden}
+    FROM libros
+    JOIN generos ON libros.genero_id = generos.id
+    {join}
     {where_clause}
-    GROUP BY libros.id
-    ORDER BY libros.titulo;
+    ORDER BY {orden_sql}
     """
-    return query, parametros
+        limite = self.limite if limite is None else limite
+        if limite is not None:
+            query += "LIMIT ?"
+            parametros.append(limite)
+        return query, parametros
 
 
-def mostrar_resultados(cursor):
-    libros = cursor.fetchall()
-    if not libros:
-        print("\n📭 No se encontraron libros con ese filtro.")
-        return
+def pedir_valor(mensaje, convertir=str, error="❌ Valor inválido.", opcional=False):
+    # Repite la pregunta hasta obtener un valor válido (Enter = None si opcional)
+    while True:
+        texto = input(mensaje).strip()
+        if opcional and not texto:
+            return None
+        try:
+            return convertir(texto)
+        except ValueError:
+            print(error)
+
+
+def rating_valido(texto):
+    if not (texto.isdigit() and 1 <= int(texto) <= 5):
+        raise ValueError(texto)
+    return int(texto)
+
+
+def texto_busqueda(texto):
+    if len(texto) < 3:
+        raise ValueError(texto)
+    return texto
 
-    print(f"\n📚 Resultados encontrados: {len(libros)}\n")
-    for libro in libros:
-        titulo, precio, stock, rating, url, genero, autores = libro
-        print(
-            f"📖 Título: {titulo}\n💵 Precio: {precio}\n📦 Stock: {stock}\n⭐ Rating: {rating}"
+
+def orden_valido(texto):
+    # "precio" ascendente, "-precio" descendente
+    campo = texto.lstrip("-")
+    if campo not in ORDENES:
+        raise ValueError(texto)
+    return campo, texto.startswith("-")
+
+
+def precio_valido(texto):
+    # float() acepta "nan", "inf" y "1e400", que después rompen round()
+    precio = float(texto)
+    if not math.isfinite(precio):
+        raise ValueError(texto)
+    return precio
+
+
+def entero_positivo(texto):
+    if not (texto.isdigit() and int(texto) > 0):
+        raise ValueError(texto)
+    return int(texto)
+
+
+ERROR_RATING = "❌ Rating inválido. Debe ser un número del 1 al 5."
+ERROR_NUMERO = "❌ Ingrese un número válido."
+ERROR_TEXTO = "❌ Ingrese al menos 3 caracteres."
+
+
+def pedir_filtros_combinados():
+    print("Deje vacío (Enter) para omitir un filtro.")
+    consulta = ConsultaLibros(
+        rating_min=pedir_valor(
+            " Rating mínimo (1-5): ", rating_valido, ERROR_RATING, opcional=True
+        ),
+        precio_min=pedir_valor(
+            " Precio mínimo (sin símbolo): ", precio_valido, ERROR_NUMERO, opcional=True
+        ),
+        precio_max=pedir_valor(
+            " Precio máximo (sin símbolo): ", precio_valido, ERROR_NUMERO, opcional=True
+        ),
+        genero=pedir_valor("📚 Género: ", opcional=True),
+        autor=pedir_valor("👨‍💼 Autor: ", opcional=True),
+        disponible=input("📦 ¿Solo disponibles? (s/n): ").strip().lower() == "s",
+        texto=pedir_valor(
+            "🔎 Texto en título o autor: ", texto_busqueda, ERROR_TEXTO, opcional=True
+        ),
+    )
+    orden = pedir_valor(
+        f"↕️ Orden ({'/'.join(ORDENES)}, '-' = descendente): ",
+        orden_valido,
+        "❌ Orden inválido.",
+        opcional=True,
+    )
+    if orden:
+        try:
+            consulta.ordenar(orden[0], descendente=orden[1])
+        except ValueError as e:
+            print(f"❌ {e}; se usa el orden por defecto.")
+    consulta.limitar(
+        pedir_valor(
+            "🔢 Máximo de resultados: ", entero_positivo, ERROR_NUMERO, opcional=True
         )
-        print(
-            f"🎭 Género: {genero}\n👨‍💼 Autor(es): {autores}\n🔗 Link: {url}\n{'-'*40}"
+    )
+    return consulta
+
+
+def construir_query(opcion):
+    if opcion == "1":
+        rating = pedir_valor(" Ingrese rating (1-5): ", rating_valido, ERROR_RATING)
+        return ConsultaLibros(rating=rating)
+    if opcion == "2":
+        precio_max = pedir_valor(
+            " Ingrese precio máximo (sin símbolo): ", precio_valido, ERROR_NUMERO
+        )
+        return ConsultaLibros(precio_max=precio_max)
+    if opcion == "3":
+        return ConsultaLibros(genero=input("📚 Ingrese nombre del género: ").strip())
+    if opcion == "4":
+        return ConsultaLibros(autor=input("👨‍💼 Ingrese nombre del autor: ").strip())
+    if opcion == "5":
+        return ConsultaLibros(disponible=True)
+    if opcion == "7":
+        texto = pedir_valor(
+            "🔎 Ingrese texto a buscar en título o autor: ", texto_busqueda, ERROR_TEXTO
         )
+        return ConsultaLibros(texto=texto)
+    if opcion == "8":
+        return pedir_filtros_combinados()
+    return ConsultaLibros()  # "6": sin filtros
+
+
+class CacheConsultas:
+    """LRU de resultados por (sql, params), válido mientras no cambie la base.
+
+    PRAGMA data_version solo cambia cuando otra conexión hace commit, así que
+    mientras se mantenga igual las filas guardadas siguen siendo correctas.
+    """
+
+    def __init__(
+        self,
+        conn,
+        max_entradas=CACHE_ENTRADAS,
+        max_filas=CACHE_FILAS,
+        invalidacion=CACHE_INVALIDACION,
+    ):
+        self.conn = conn
+        self.max_entradas = max_entradas
+        self.max_filas = max_filas
+        self.invalidacion = invalidacion
+        self.resultados = OrderedDict()
+        self.filas = 0
+        self.aciertos = self.fallos = 0
+        self.version = self.leer_version()
+        self.generacion = generacion_crawl(conn)
+
+    def leer_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
 
-    exportar = (
-        input("\n💾 ¿Desea exportar estos resultados a CSV? (s/n): ").strip().lower()
+    def vaciar(self):
+        self.resultados.clear()
+        self.filas = 0
+
+    def validar(self):
+        version = self.leer_version()
+        if version == self.version:
+            return
+        self.version = version
+        generacion = generacion_crawl(self.conn)
+        if self.invalidacion != "crawl" or generacion != self.generacion:
+            self.vaciar()
+        self.generacion = generacion
+
+    def consultar(self, sql, params=()):
+        self.validar()
+        clave = (sql, tuple(params))
+        filas = self.resultados.get(clave)
+        if filas is not None:
+            self.resultados.move_to_end(clave)
+            self.aciertos += 1
+            return filas
+
+        self.fallos += 1
+        filas = self.conn.execute(sql, params).fetchall()
+        if len(filas) <= self.max_filas:
+            self.resultados[clave] = filas
+            self.filas += len(filas)
+            while len(self.resultados) > self.max_entradas or (
+                self.filas > self.max_filas
+            ):
+                _, descartadas = self.resultados.popitem(last=False)
+                self.filas -= len(descartadas)
+        return filas
+
+
+def mostrar_libro(libro):
+    titulo, precio, stock, rating, url, genero, autores = libro[:7]
+    print(
+        f"📖 Título: {titulo}\n💵 Precio: {precio}\n📦 Stock: {stock}\n⭐ Rating: {rating}"
     )
-    if exportar == "s":
-        exportar_a_csv(libros)
+    print(f"🎭 Género: {genero}\n👨‍💼 Autor(es): {autores}\n🔗 Link: {url}\n{'-'*40}")
+
+
+def mostrar_en_streaming(cursor, consulta, despues_de=None, limite=None):
+    # Lee en bloques con fetchmany: la memoria no depende del total de filas
+    cursor.execute(*consulta.sql(despues_de, limite))
+    total = 0
+    while True:
+        libros = cursor.fetchmany(TAMANO_BLOQUE)
+        if not libros:
+            break
+        for libro in libros:
+            mostrar_libro(libro)
+        total += len(libros)
+    return total
+
+
+def mostrar_resultados(cursor, consulta, cache=None):
+    inicios = [None]  # clave desde la que empieza cada página visitada
+
+    while True:
+        # Se pide una fila extra para saber si existe página siguiente
+        sql, params = consulta.sql(inicios[-1], TAMANO_PAGINA + 1)
+        if cache is not None:
+            libros = cache.consultar(sql, params)
+        else:
+            libros = cursor.execute(sql, params).fetchall()
+        if not libros:
+            print("\n📭 No se encontraron libros con ese filtro.")
+            return
+        # Con límite total, las páginas anteriores ya mostraron parte de él
+        restantes = None
+        if consulta.limite is not None:
+            restantes = consulta.limite - (len(inicios) - 1) * TAMANO_PAGINA
+            libros = libros[:restantes]
+        hay_siguiente = len(libros) > TAMANO_PAGINA
+        libros = libros[:TAMANO_PAGINA]
+
+        print(f"\n📚 Página {len(inicios)}\n")
+        for libro in libros:
+            mostrar_libro(libro)
+
+        ultima_clave = tuple(libros[-1][7:])
+        accion = (
+            input(
+                "\n[s] siguiente  [a] anterior  [t] mostrar todo lo que sigue"
+                "  [e] exportar a CSV  [c] exportar columnar  [Enter] volver: "
+            )
+            .strip()
+            .lower()
+        )
+        if accion == "s" and hay_siguiente:
+            inicios.append(ultima_clave)
+        elif accion == "a" and len(inicios) > 1:
+            inicios.pop()
+        elif accion == "t":
+            if restantes is not None:
+                restantes -= len(libros)
+                if restantes <= 0:
+                    print("\n📚 No hay más resultados dentro del límite.")
+                    return
+            total = mostrar_en_streaming(cursor, consulta, ultima_clave, restantes)
+            print(f"\n📚 Se mostraron {total} libros más.")
+            return
+        elif accion == "e":
+            pedir_exportacion(cursor, consulta)
+        elif accion == "c":
+            pedir_exportacion_columnar(cursor, consulta)
+        elif accion == "":
+            return
+        else:
+            print("❌ No hay más páginas en esa dirección u opción no válida.")
 
 
 def main():
     conn = conectar_db()
+    # Una base creada por una versión anterior no tiene las columnas nuevas
+    preparar_db(conn)
     cursor = conn.cursor()
+    cache = CacheConsultas(conn) if CACHE_ENTRADAS > 0 else None
 
     while True:
         mostrar_menu()
@@ -121,14 +696,9 @@ def main():
         if opcion == "0":
             print("👋 Saliendo del visor...")
             break
-        elif opcion in {"1", "2", "3", "4", "5"}:
-            query, params = construir_query(opcion)
-            cursor.execute(query, params)
-            mostrar_resultados(cursor)
-        elif opcion == "6":
-            query, params = construir_query("6")  # sin filtros
-            cursor.execute(query)
-            mostrar_resultados(cursor)
+        elif opcion in {"1", "2", "3", "4", "5", "6", "7", "8"}:
+            consulta = construir_query(opcion)
+            mostrar_resultados(cursor, consulta, cache)
         else:
             print("❌ Opción no válida. Intente nuevamente.")
 